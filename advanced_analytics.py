@@ -4,18 +4,18 @@ from typing import Dict, List, Tuple, Any
 from collections import Counter
 import nltk
 from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import textstat
 from config import config
+from error_handler import error_handler
+from resources import get_stopwords
 
 class AdvancedPitchAnalyzer:
     """Advanced AI-powered pitch deck analyzer with comprehensive insights."""
     
     def __init__(self):
         try:
-            self.stop_words = set(stopwords.words('english'))
+            self.stop_words = set(get_stopwords())
         except:
             self.stop_words = set()
         self.setup_analysis_patterns()
@@ -137,6 +137,23 @@ class AdvancedPitchAnalyzer:
             recommendations.append("✨ Use more positive, confident language")
         
         return recommendations[:5]
+    
+    def benchmark_against_corpus(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Percentile of a comprehensive analysis against all saved analyses.
+
+        An unreadable or locked benchmark logs a warning and yields no percentiles.
+        """
+        from corpus_benchmark import get_corpus_benchmark
+        
+        try:
+            benchmark = get_corpus_benchmark()
+            return {
+                'corpus_size': benchmark.corpus_size(),
+                'percentiles': benchmark.percentiles(analysis)
+            }
+        except Exception as e:
+            error_handler.logger.warning(f"Corpus benchmark unavailable: {str(e)}")
+            return {'corpus_size': 0, 'percentiles': {}}
 
 # Global instance
 advanced_analyzer = AdvancedPitchAnalyzer()
\ No newline at end of file
@@ -12,7 +12,6 @@ from figma_ui_fixed import (
 )
 from login_form import render_figma_login_form
 from signup_form import render_figma_signup_form
-from database_service import DatabaseService
 from advanced_analytics import advanced_analyzer
 from supabase import create_client, Client
 from datetime import datetime
@@ -395,8 +394,8 @@ if 'auth' not in st.session_state:
     from auth_handler import AuthHandler
     st.session_state.auth = AuthHandler(st.session_state.sb)
 if 'db_service' not in st.session_state:
-    from database_service import DatabaseService
-    st.session_state.db_service = DatabaseService(st.session_state.sb)
+    from storage_backend import create_storage_backend
+    st.session_state.db_service = create_storage_backend(st.session_state.sb)
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False
 if 'logged_in' not in st.session_state:
@@ -428,6 +427,8 @@ def main():
     from login_form import render_figma_login_form
     from signup_form import render_figma_signup_form
     st.set_page_config(layout="wide", initial_sidebar_state="expanded")
+    from resources import start_resource_warmup
+    start_resource_warmup()  # no-op after the first run in this process
     from app import apply_responsive_styles
     apply_responsive_styles()
     handle_actions()
@@ -447,42 +448,48 @@ def main():
     st.session_state.current_user = current_user
     apply_global_styles()
     render_navigation_bar(current_user)
+    schema = st.session_state.db_service.schema
+    if schema and schema.error:
+        st.error(f"Analysis history is unavailable: {schema.error}. Check the 'analyses' table.")
     
     # --- Get user analyses for sidebar ---
+    from performance_optimizer import get_user_analyses_cached
     db_service = st.session_state.db_service
     analyses = []
+    stats = None
     
-    # Try to get from session state first (for performance)
-    if 'analyses' in st.session_state and st.session_state.analyses:
-        analyses = st.session_state.analyses
-    
-    # If not in session state or empty, fetch from database
-    if not analyses:
-        try:
-            user = st.session_state.current_user
-            if isinstance(user, dict):
-                user_id = user.get('id') or user.get('user_id')
-            else:
-                user_id = getattr(user, 'id', None) or getattr(user, 'user_id', None) if user else None
-            if user_id:
-                analyses = db_service.get_user_analyses(user_id)
-                st.session_state.analyses = analyses  # Store in session state
-                
-                # Analyses fetched successfully
-            else:
-                # No user authenticated
-                pass
-        except Exception as e:
-            # Database error occurred
-            analyses = []
+    # The per-user history cache is kept current by save/delete, so this only hits the database on a miss
+    try:
+        user = st.session_state.current_user
+        if isinstance(user, dict):
+            user_id = user.get('id') or user.get('user_id')
+        else:
+            user_id = getattr(user, 'id', None) or getattr(user, 'user_id', None) if user else None
+        if user_id:
+            analyses = get_user_analyses_cached(user_id, db_service) or []
+            stats = db_service.get_user_stats(user_id)
+    except Exception as e:
+        # Database error occurred
+        analyses = []
+    st.session_state.analyses = analyses
     
     # Real analyses will be shown here when available
     
     # Render sidebar with analyses
-    render_figma_sidebar(current_user, analyses)
+    render_figma_sidebar(current_user, analyses, stats)
 
     render_figma_main_content()
     # (Add your file upload/analysis/dashboard logic here)
+    if config.debug_mode:
+        from performance_optimizer import render_cache_stats_panel
+        from resources import registry
+        from storage_backend import get_save_metrics
+        from model_service import quality_model_error
+        render_cache_stats_panel()
+        st.caption(f"Analysis saves: {get_save_metrics()}")
+        if quality_model_error():
+            st.caption(f"Quality model refused: {quality_model_error()}")
+        st.caption(f"Resources {'ready' if registry.is_ready else 'warming up'}; load times (ms): {registry.load_ms}")
 
 if __name__ == "__main__":
     main()
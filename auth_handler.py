@@ -14,6 +14,15 @@ def clear_sensitive_session_state():
         if key in st.session_state:
             del st.session_state[key]
 
+def is_admin(user) -> bool:
+    """Return True if the user's email is listed in the admin_emails secret."""
+    from config import config
+    if isinstance(user, dict):
+        email = user.get('email')
+    else:
+        email = getattr(user, 'email', None)
+    return bool(email) and email.lower() in config.get_admin_emails()
+
 class AuthHandler:
     def __init__(self, supabase_client: Client):
         """Initialize AuthHandler with a Supabase client."""
@@ -0,0 +1,106 @@
+import sys
+import numpy as np
+from scipy.sparse import issparse
+from typing import Dict
+
+# Marker sklearn uses for "no child" in tree_.children_left/right
+TREE_LEAF = -1
+
+class CompactForest:
+    """A regression forest flattened into contiguous NumPy arrays.
+
+    All trees share one node table; `roots` holds the offset of each tree's
+    root node and child indices are absolute. Evaluation walks every tree of
+    every sample at once, one depth level per step.
+    """
+
+    ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompactForest":
+        """Flatten a fitted single-output RandomForestRegressor."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output regression forests can be exported")
+
+        node_counts = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+
+        def absolute(children, offset):
+            return np.where(children == TREE_LEAF, TREE_LEAF, children + offset)
+
+        return cls(
+            feature=np.concatenate([tree.feature for tree in trees]),
+            threshold=np.concatenate([tree.threshold for tree in trees]),
+            left=np.concatenate([absolute(tree.children_left, offset) for tree, offset in zip(trees, roots)]),
+            right=np.concatenate([absolute(tree.children_right, offset) for tree, offset in zip(trees, roots)]),
+            value=np.concatenate([tree.value[:, 0, 0] for tree in trees]),
+            roots=roots,
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=model.n_features_in_
+        )
+
+    def save(self, path: str):
+        """Write the forest as an uncompressed .npz archive."""
+        np.savez(path, max_depth=self.max_depth, n_features=self.n_features,
+                 **{name: getattr(self, name) for name in self.ARRAY_NAMES})
+
+    @classmethod
+    def load(cls, path: str) -> "CompactForest":
+        """Load a forest written by `save`."""
+        with np.load(path) as data:
+            arrays: Dict[str, np.ndarray] = {name: data[name] for name in cls.ARRAY_NAMES}
+            return cls(max_depth=int(data['max_depth']), n_features=int(data['n_features']), **arrays)
+
+    def _predict_dense(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            is_leaf = left == TREE_LEAF
+            if is_leaf.all():
+                break
+            # Leaves have feature -2; the lookup is valid and its result is discarded
+            goes_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(is_leaf, nodes, np.where(goes_left, left, self.right[nodes]))
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X, batch_size: int = 256) -> np.ndarray:
+        """Predict like RandomForestRegressor.predict for dense or sparse X."""
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], batch_size):
+            chunk = X[start:start + batch_size]
+            chunk = chunk.toarray() if issparse(chunk) else np.asarray(chunk)
+            # sklearn evaluates trees on float32 inputs; match it exactly
+            predictions[start:start + batch_size] = self._predict_dense(chunk.astype(np.float32))
+        return predictions
+
+def verify_against(model, forest: CompactForest, X, rtol: float = 1e-9, atol: float = 1e-9) -> float:
+    """Check the compact forest reproduces the sklearn model on X; return the max abs error."""
+    expected = model.predict(X)
+    actual = forest.predict(X)
+    if not np.allclose(expected, actual, rtol=rtol, atol=atol):
+        raise AssertionError("Compact forest predictions diverge from the sklearn model")
+    return float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+
+if __name__ == "__main__":
+    # Usage: python compact_forest.py pitch_quality_model.pkl pitch_quality_forest.npz
+    import joblib
+    if len(sys.argv) != 3:
+        print("Usage: python compact_forest.py <model.pkl> <forest.npz>")
+        sys.exit(1)
+    CompactForest.from_sklearn(joblib.load(sys.argv[1])).save(sys.argv[2])
+    print(f"✅ Compact forest written to '{sys.argv[2]}'")
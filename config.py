@@ -33,6 +33,7 @@ class UIConfig:
     THEME_ERROR_COLOR: str = "#ef4444"
     MAX_TEXT_PREVIEW: int = 2000
     MAX_HISTORY_ITEMS: int = 10
+    HISTORY_PAGE_SIZE: int = 5  # sidebar history rows fetched per page
 
 @dataclass
 class CacheConfig:
@@ -41,8 +42,14 @@ class CacheConfig:
     TEXT_EXTRACTION_MAX_ENTRIES: int = 50
     NLP_ANALYSIS_TTL: int = 3600  # 1 hour
     NLP_ANALYSIS_MAX_ENTRIES: int = 100
+    NLP_ANALYSIS_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB of pickled results
+    SHARED_CACHE_ENABLED: bool = True  # on-disk tier shared by all server processes
+    SHARED_CACHE_PATH: str = "analysis_cache.sqlite3"
+    SHARED_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB compressed
     USER_ANALYSES_TTL: int = 1800  # 30 minutes
     USER_ANALYSES_MAX_ENTRIES: int = 20
+    USER_ANALYSES_MAX_BYTES: int = 16 * 1024 * 1024  # 16MB
+    USER_STATS_TTL: int = 60  # seconds a displayed stats row may lag other processes' writes
 
 @dataclass
 class SecurityConfig:
@@ -61,8 +68,25 @@ class AnalysisConfig:
     SENTIMENT_THRESHOLD: float = 0.1
     MAX_KEYWORDS: int = 15
     SECTION_CRITERIA: list = None
+    LEXICONS: Dict[str, list] = None
+    BENCHMARK_SKETCH_PATH: str = "corpus_benchmark.json"
+    BENCHMARK_SKETCH_K: int = 200
+    SIMILARITY_INDEX_DIR: str = "similarity_index"
+    SIMILARITY_DIM: int = 128
+    SIMILARITY_TABLES: int = 8
+    SIMILARITY_BITS: int = 12
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 3  # SimHash bits an upload may differ by to count as a near match
+    STATS_EMA_ALPHA: float = 0.3  # weight of the newest score in a user's rolling average
     
     def __post_init__(self):
+        if self.LEXICONS is None:
+            self.LEXICONS = {
+                'transition': ['however', 'therefore', 'furthermore', 'moreover', 'consequently',
+                               'additionally', 'meanwhile', 'subsequently', 'thus', 'hence'],
+                'action': ['achieve', 'deliver', 'create', 'build', 'develop', 'launch', 'scale', 'grow'],
+                'emotional': ['excited', 'passionate', 'innovative', 'revolutionary', 'breakthrough']
+            }
+        
         if self.SECTION_CRITERIA is None:
             self.SECTION_CRITERIA = [
                 {
@@ -112,6 +136,36 @@ class AnalysisConfig:
                 }
             ]
 
+@dataclass
+class ModelConfig:
+    """ML quality model configuration."""
+    MODEL_PATH: str = "pitch_quality_model.pkl"
+    VECTORIZER_PATH: str = "tfidf_vectorizer.pkl"
+    COMPACT_MODEL_PATH: str = "pitch_quality_forest.npz"
+    # Off until a model trained on the current FEATURE_VERSION is committed; the
+    # checked-in one predates it and is refused at load
+    ENABLE_ML_SCORING: bool = False
+    MODEL_CARD_PATH: str = "model_card.json"
+    CARD_LATENCY_SAMPLES: int = 200
+    CARD_BATCH_SIZE: int = 1000
+    # Budgets a new model is checked against, as ratios of the current model card
+    MAX_LATENCY_REGRESSION: float = 1.25
+    MAX_LOAD_TIME_REGRESSION: float = 1.5
+    MAX_SIZE_REGRESSION: float = 1.5
+    LATENCY_NOISE_MS: float = 0.05  # Latency differences below this are ignored
+
+@dataclass
+class PersistenceConfig:
+    """Where and how analyses are saved."""
+    QUEUE_MAX_SIZE: int = 100
+    MAX_SAVE_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: float = 0.5  # seconds, doubled after every failed attempt
+    RETRY_MAX_DELAY: float = 30.0
+    DEAD_LETTER_PATH: str = "failed_saves.jsonl"
+    STORAGE_BACKEND: str = "supabase"  # or "sqlite" for a local database file
+    SQLITE_DB_PATH: str = "analyses.sqlite3"
+    PAYLOAD_COMPRESSION: str = "zlib"  # or "zstd", which every host reading the rows must have installed
+
 class AppConfig:
     """Main application configuration."""
     
@@ -121,6 +175,8 @@ class AppConfig:
         self.cache = CacheConfig()
         self.security = SecurityConfig()
         self.analysis = AnalysisConfig()
+        self.model = ModelConfig()
+        self.persistence = PersistenceConfig()
         self.debug_mode = self._get_debug_mode()
     
     def _get_debug_mode(self) -> bool:
@@ -130,6 +186,13 @@ class AppConfig:
         except:
             return False
     
+    def get_admin_emails(self) -> list:
+        """Get the emails of users allowed to see data across all users."""
+        try:
+            return [email.lower() for email in st.secrets.get("admin_emails", [])]
+        except:
+            return []
+    
     def get_supabase_config(self) -> Dict[str, str]:
         """Get Supabase configuration."""
         try:
@@ -163,6 +226,11 @@ class AppConfig:
             assert self.analysis.MIN_TEXT_LENGTH > 0
             assert self.analysis.MAX_TEXT_LENGTH > self.analysis.MIN_TEXT_LENGTH
             assert len(self.analysis.SECTION_CRITERIA) > 0
+            assert all(len(words) > 0 for words in self.analysis.LEXICONS.values())
+            
+            # Validate persistence config
+            assert self.persistence.STORAGE_BACKEND in ("supabase", "sqlite")
+            assert self.persistence.PAYLOAD_COMPRESSION in ("zlib", "zstd")
             
             return True
         except AssertionError as e:
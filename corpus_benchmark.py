@@ -0,0 +1,196 @@
+import os
+import json
+import math
+import random
+import bisect
+import tempfile
+import threading
+import streamlit as st
+from typing import Dict, List, Optional, Any
+from config import config
+from error_handler import error_handler
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch.
+
+    Items live in a stack of compactors; an item at level h stands for 2**h
+    inputs. Memory is O(k) regardless of how many values are added, and two
+    sketches of different data can be merged into a sketch of the union.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random()
+        self._sorted: Optional[List[float]] = None
+        self._cumulative: Optional[List[int]] = None
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    compactor.sort()
+                    # An odd leftover stays at this level so no weight is lost
+                    leftover = [compactor.pop()] if len(compactor) % 2 else []
+                    offset = self._rng.randint(0, 1)
+                    self.compactors[level + 1].extend(compactor[offset::2])
+                    self.compactors[level] = leftover
+                    break
+        self._sorted = None
+
+    def update(self, value: float):
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._sorted = None
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.n += other.n
+        self._compress()
+
+    def _build_index(self):
+        weighted = sorted((value, 1 << level) for level, compactor in enumerate(self.compactors) for value in compactor)
+        self._sorted = [value for value, _ in weighted]
+        self._cumulative = []
+        total = 0
+        for _, weight in weighted:
+            total += weight
+            self._cumulative.append(total)
+
+    def _weight_below(self, index: int) -> int:
+        return self._cumulative[index - 1] if index > 0 else 0
+
+    def percentile(self, value: float) -> Optional[float]:
+        """Percent of recorded values below `value`, counting ties as half."""
+        if self.n == 0:
+            return None
+        if self._sorted is None:
+            self._build_index()
+        lo = bisect.bisect_left(self._sorted, value)
+        hi = bisect.bisect_right(self._sorted, value)
+        below = self._weight_below(lo)
+        equal = self._weight_below(hi) - below
+        total = self._cumulative[-1]
+        return round(100 * (below + equal / 2) / total, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'k': self.k, 'n': self.n, 'compactors': [[round(v, 4) for v in c] for c in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data['k'])
+        sketch.n = data['n']
+        sketch.compactors = [list(compactor) for compactor in data['compactors']] or [[]]
+        return sketch
+
+def benchmark_metrics(analysis: Dict[str, Any]) -> Dict[str, float]:
+    """The values a comprehensive_analysis result is benchmarked on."""
+    basic = analysis['basic']
+    metrics = {
+        'overall_score': (basic['score'] / 10) * 100,
+        'readability': basic['readability'],
+        'sentiment': basic['sentiment'].get('compound', 0)
+    }
+    for name, covered in basic['section_scores'].items():
+        metrics[f"section:{name}"] = covered
+    return metrics
+
+class CorpusBenchmark:
+    """Per-metric quantile sketches of every saved analysis, persisted to one file.
+
+    Updates accumulate in a local delta that is merged into the file under a
+    lock, so several server processes can record into the same sketches.
+    """
+
+    def __init__(self, path: str, k: int):
+        self.path = path
+        self.k = k
+        self._lock = threading.Lock()
+        self._sketches: Dict[str, KLLSketch] = {}
+        self._loaded_mtime = None
+
+    def _read_file(self) -> Dict[str, KLLSketch]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return {name: KLLSketch.from_dict(data) for name, data in json.load(f).items()}
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._loaded_mtime:
+            self._sketches = self._read_file()
+            self._loaded_mtime = mtime
+
+    def record(self, analysis: Dict[str, Any]):
+        """Add one analysis to the corpus sketches and persist them."""
+        delta = {}
+        for name, value in benchmark_metrics(analysis).items():
+            delta[name] = KLLSketch(k=self.k)
+            delta[name].update(value)
+
+        with self._lock, open(self.path + '.lock', 'w') as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            sketches = self._read_file()
+            for name, sketch in delta.items():
+                sketches.setdefault(name, KLLSketch(k=self.k)).merge(sketch)
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as tmp:
+                json.dump({name: sketch.to_dict() for name, sketch in sketches.items()}, tmp, separators=(',', ':'))
+            os.replace(tmp.name, self.path)
+
+            self._sketches = sketches
+            self._loaded_mtime = os.path.getmtime(self.path)
+
+    def percentiles(self, analysis: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Percentile of each metric of `analysis` within the corpus."""
+        with self._lock:
+            self._refresh()
+            return {
+                name: self._sketches[name].percentile(value) if name in self._sketches else None
+                for name, value in benchmark_metrics(analysis).items()
+            }
+
+    def corpus_size(self) -> int:
+        with self._lock:
+            self._refresh()
+            sketch = self._sketches.get('overall_score')
+            return sketch.n if sketch else 0
+
+@st.cache_resource(show_spinner=False)
+def get_corpus_benchmark() -> CorpusBenchmark:
+    """Process-wide benchmark store."""
+    return CorpusBenchmark(config.analysis.BENCHMARK_SKETCH_PATH, config.analysis.BENCHMARK_SKETCH_K)
+
+def record_for_benchmark(analysis: Dict[str, Any]):
+    """Record a saved analysis in the corpus sketches, logging rather than raising on failure."""
+    try:
+        get_corpus_benchmark().record(analysis)
+    except Exception as e:
+        error_handler.logger.warning(f"Failed to record analysis for benchmarking: {str(e)}")
@@ -1,101 +1,265 @@
 import streamlit as st
 from supabase import Client
-from datetime import datetime
 from typing import List, Dict, Optional, Any
+from config import config
 from error_handler import handle_database_errors
-import json
+from performance_optimizer import perf_optimizer
+from storage_backend import (StorageBackend, AnalysesSchema, KNOWN_COLUMNS, REQUIRED_COLUMNS,
+                             RESULT_COLUMNS, count_save)
+from user_stats import UserStats, SupabaseUserStatsStore, local_stats_store
 
-class DatabaseService:
+def _is_missing_column_error(e: Exception) -> bool:
+    # PostgREST reports unknown columns with Postgres error 42703
+    return getattr(e, "code", None) == "42703" or "does not exist" in str(e)
+
+def _is_missing_constraint_error(e: Exception) -> bool:
+    # ON CONFLICT on a column without a unique constraint fails with Postgres error 42P10
+    return getattr(e, "code", None) == "42P10" or "no unique or exclusion constraint" in str(e)
+
+# Set once an upsert on client_id is rejected; later saves go straight to plain inserts
+_client_id_upsert = {"unsupported": False}
+
+@st.cache_resource(show_spinner=False)
+def detect_analyses_schema(_sb: Client) -> AnalysesSchema:
+    """Probe the 'analyses' table columns once per process.
+
+    One request checks every known column; only if that fails on a missing
+    column is each column probed on its own. Other errors (network, auth)
+    propagate, so nothing is cached and detection is retried.
+    """
+    try:
+        _sb.table("analyses").select(",".join(KNOWN_COLUMNS)).limit(1).execute()
+        columns = set(KNOWN_COLUMNS)
+    except Exception as e:
+        if not _is_missing_column_error(e):
+            raise
+        columns = set()
+        for column in KNOWN_COLUMNS:
+            try:
+                _sb.table("analyses").select(column).limit(1).execute()
+                columns.add(column)
+            except Exception as column_error:
+                if not _is_missing_column_error(column_error):
+                    raise
+
+    date_column = "date" if "date" in columns else "created_at" if "created_at" in columns else None
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    error = None
+    if missing:
+        error = f"The 'analyses' table is missing required columns: {', '.join(missing)}"
+    elif not columns & set(RESULT_COLUMNS):
+        error = f"The 'analyses' table has none of the result columns: {', '.join(RESULT_COLUMNS)}"
+    return AnalysesSchema(frozenset(columns), date_column, error)
+
+@st.cache_resource(show_spinner=False)
+def get_user_stats_store(_sb: Client):
+    """The 'user_stats' table if it exists, else the in-process stand-in; decided once per process.
+
+    The table and the analyses columns it relies on are created by supabase_schema.sql.
+    """
+    try:
+        _sb.table(SupabaseUserStatsStore.TABLE).select("user_id,version").limit(1).execute()
+        return SupabaseUserStatsStore(_sb, cache_ttl=config.cache.USER_STATS_TTL)
+    except Exception as e:
+        if getattr(e, "code", None) != "42P01" and "does not exist" not in str(e):
+            raise  # not a missing table; don't cache the fallback
+        print("No user_stats table with a version column (see supabase_schema.sql); "
+              "keeping per-user stats in process memory")
+        return local_stats_store
+
+class DatabaseService(StorageBackend):
     """Handle all database operations with Supabase."""
     
     def __init__(self, supabase_client: Client):
         self.sb = supabase_client
     
-    def save_analysis(self, user_id, analysis_data):
-        """Save a user's analysis to the 'analyses' table."""
-        # Try multiple approaches to save the analysis
-        approaches = [
-            # Approach 1: Simple structure with just essential fields
-            {
-                "user_id": user_id,
-                "filename": analysis_data.get("filename", "Unknown"),
-                "score": analysis_data.get("overall_score", 0),
-                "date": datetime.now().isoformat()
-            },
-            # Approach 2: With analysis_data JSON column
-            {
-                "user_id": user_id,
-                "filename": analysis_data.get("filename", "Unknown"),
-                "analysis_data": json.dumps(analysis_data),
-                "created_at": datetime.now().isoformat()
-            },
-            # Approach 3: Individual columns
-            {
-                "user_id": user_id,
-                "filename": analysis_data.get("filename", "Unknown"),
-                "score": analysis_data.get("score", 0),
-                "readability_score": analysis_data.get("readability_score", 0),
-                "sentiment": analysis_data.get("sentiment", "neutral"),
-                "grade": analysis_data.get("grade", "N/A"),
-                "overall_score": analysis_data.get("overall_score", 0),
-                "strengths": json.dumps(analysis_data.get("strengths", [])),
-                "weaknesses": json.dumps(analysis_data.get("weaknesses", [])),
-                "tips": json.dumps(analysis_data.get("tips", [])),
-                "keywords": json.dumps(analysis_data.get("keywords", [])),
-                "created_at": datetime.now().isoformat()
-            }
-        ]
-        
-        for i, data in enumerate(approaches):
-            try:
-                res = self.sb.table("analyses").insert(data).execute()
-                if res.data and len(res.data) > 0:
-                    print(f"Analysis saved successfully using approach {i+1}")
-                    return True
-            except Exception as e:
-                print(f"Approach {i+1} failed: {e}")
-                continue
+    @property
+    def schema(self) -> Optional[AnalysesSchema]:
+        """The detected 'analyses' schema, or None if it could not be probed (retried on next use)."""
+        try:
+            return detect_analyses_schema(self.sb)
+        except Exception as e:
+            print(f"Schema detection failed: {e}")
+            return None
+
+    def save_analysis(self, user_id, analysis_data, client_id=None, retry=False, raise_errors=False):
+        """Save a user's analysis to the 'analyses' table; return the inserted row or False.
+
+        `client_id` makes retries idempotent. A retry first looks the row up by
+        'client_id' (or, without that column, by content hash). With a unique
+        constraint on 'client_id' the insert is an upsert that ignores
+        duplicates; without one it falls back to a plain insert. Stats are
+        only updated for a newly inserted row. With `raise_errors`, failures
+        raise instead of returning False.
+        """
+        schema = self.schema
+        if schema is None or schema.error:
+            count_save(failed=True)
+            message = f"Analysis not saved: {schema.error if schema else 'schema unavailable'}"
+            print(message)
+            if raise_errors:
+                raise RuntimeError(message)
+            return False
         
-        print("All save approaches failed")
+        try:
+            has_client_id = bool(client_id) and "client_id" in schema.columns
+            if retry:
+                if has_client_id:
+                    existing = self.find_analysis_by_client_id(user_id, client_id)
+                elif analysis_data.get("content_hash"):
+                    existing = self.find_analysis_by_content_hash(user_id, analysis_data["content_hash"])
+                else:
+                    existing = None
+                if existing:
+                    count_save(failed=False)
+                    return existing
+
+            payload = self._insert_payload(schema, user_id, analysis_data, client_id)
+            table = self.sb.table("analyses")
+            res = None
+            if has_client_id and not _client_id_upsert["unsupported"]:
+                try:
+                    res = table.upsert(payload, on_conflict="client_id", ignore_duplicates=True).execute()
+                except Exception as e:
+                    if not _is_missing_constraint_error(e):
+                        raise
+                    _client_id_upsert["unsupported"] = True
+                    print("No unique constraint on analyses.client_id; saving with plain inserts")
+            if res is None:
+                res = table.insert(payload).execute()
+
+            if res.data and len(res.data) > 0:
+                count_save(failed=False)
+                row = self._parse_row(res.data[0])
+                perf_optimizer.add_to_user_history(user_id, self.list_row(row))
+                self._record_saved_stats(user_id, analysis_data.get("overall_score", 0), row.get(self.date_column))
+                return row
+            if has_client_id:
+                # The upsert ignored a duplicate: this client id was already saved
+                existing = self.find_analysis_by_client_id(user_id, client_id)
+                if existing:
+                    count_save(failed=False)
+                    return existing
+        except Exception as e:
+            print(f"Saving analysis failed: {e}")
+            count_save(failed=True)
+            if raise_errors:
+                raise
+            return False
+
+        count_save(failed=True)
+        if raise_errors:
+            raise RuntimeError("The insert returned no row")
         return False
 
+    def list_user_analyses(self, user_id, limit: int, after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """One page of a user's history, newest first, with list-view columns only.
+
+        Pages are keyed on (date, id): pass the last row of the previous page as
+        `after`, so every page is a bounded index scan however deep it is.
+        """
+        date_column = self.date_column
+        query = self.sb.table("analyses").select(",".join(self.list_columns())).eq("user_id", user_id)
+        if after is not None:
+            last_date, last_id = after[date_column], after["id"]
+            query = query.or_(f'{date_column}.lt."{last_date}",and({date_column}.eq."{last_date}",id.lt.{last_id})')
+        res = query.order(date_column, desc=True).order("id", desc=True).limit(limit).execute()
+        return res.data or []
+
+    def get_analysis(self, user_id, analysis_id) -> Optional[Dict[str, Any]]:
+        """Fetch one full analysis row, e.g. when the user opens it from the history."""
+        res = self.sb.table("analyses").select("*").eq("user_id", user_id).eq("id", analysis_id).limit(1).execute()
+        return self._parse_row(res.data[0]) if res.data else None
+
+    def find_analysis_by_content_hash(self, user_id, content_hash: str) -> Optional[Dict[str, Any]]:
+        """The list row of a saved analysis of identical content, if the table records content hashes."""
+        schema = self.schema
+        if schema is None or "content_hash" not in schema.columns:
+            return None
+        res = (self.sb.table("analyses").select(",".join(self.list_columns()))
+               .eq("user_id", user_id).eq("content_hash", content_hash).limit(1).execute())
+        return res.data[0] if res.data else None
+
+    def find_analysis_by_client_id(self, user_id, client_id: str) -> Optional[Dict[str, Any]]:
+        """The list row saved under a client-generated analysis id."""
+        res = (self.sb.table("analyses").select(",".join(self.list_columns()))
+               .eq("user_id", user_id).eq("client_id", client_id).limit(1).execute())
+        return res.data[0] if res.data else None
+
     def get_user_analyses(self, user_id):
         """Fetch all analyses for a user from the 'analyses' table."""
-        res = self.sb.table("analyses").select("*").eq("user_id", user_id).order("date", desc=True).execute()
+        res = self.sb.table("analyses").select("*").eq("user_id", user_id).order(self.date_column, desc=True).execute()
         if hasattr(res, 'data'):
-            # Parse analysis_data JSON for each record
-            for row in res.data:
-                if isinstance(row.get("analysis_data"), str):
-                    try:
-                        row["analysis_data"] = json.loads(row["analysis_data"])
-                    except Exception:
-                        pass
-            return res.data
+            return [self._parse_row(row) for row in res.data]
         return []
     
+    @property
+    def stats_store(self):
+        try:
+            return get_user_stats_store(self.sb)
+        except Exception:
+            return local_stats_store
+
+    @property
+    def score_column(self) -> str:
+        schema = self.schema
+        return "overall_score" if schema and "overall_score" in schema.columns else "score"
+
+    def _rebuild_user_stats(self, user_id) -> UserStats:
+        """Recompute a user's stats from just their scores and dates, oldest first."""
+        score_column, date_column = self.score_column, self.date_column
+        res = (self.sb.table("analyses").select(f"{score_column},{date_column}")
+               .eq("user_id", user_id).order(date_column).execute())
+        stats = UserStats()
+        for row in res.data or []:
+            stats.add(float(row.get(score_column) or 0), row.get(date_column), config.analysis.STATS_EMA_ALPHA)
+        self.stats_store.put(user_id, stats)
+        return stats
+
+    def _record_saved_stats(self, user_id, score, date):
+        def add(stats: UserStats) -> bool:
+            stats.add(float(score or 0), date, config.analysis.STATS_EMA_ALPHA)
+            return True
+
+        try:
+            if self.stats_store.update(user_id, add) is None:
+                self._rebuild_user_stats(user_id)  # the rebuild already includes the new row
+        except Exception as e:
+            print(f"Updating user stats failed: {e}")
+            self.stats_store.delete(user_id)
+
+    def _record_deleted_stats(self, user_id, deleted_row):
+        if not deleted_row:
+            self.stats_store.delete(user_id)  # rebuilt on the next read
+            return
+
+        def remove(stats: UserStats) -> bool:
+            return stats.remove(float(deleted_row.get(self.score_column) or 0), deleted_row.get(self.date_column))
+
+        try:
+            if self.stats_store.update(user_id, remove) is False:
+                self.stats_store.delete(user_id)  # rebuilt on the next read
+        except Exception as e:
+            print(f"Updating user stats failed: {e}")
+            self.stats_store.delete(user_id)
+
     @handle_database_errors
     def delete_analysis(self, user_id: str, analysis_id: str) -> bool:
         """Delete a specific analysis."""
+        from similarity_index import unindex_analysis
         try:
             result = self.sb.table('analyses').delete().eq('user_id', user_id).eq('id', analysis_id).execute()
+            perf_optimizer.remove_from_user_history(user_id, analysis_id)
+            unindex_analysis(analysis_id)
+            self._record_deleted_stats(user_id, result.data[0] if result.data else None)
             return True
         except Exception:
             return False
     
     @handle_database_errors
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
-        """Get user statistics."""
-        try:
-            analyses = self.get_user_analyses(user_id, limit=100)
-            if not analyses:
-                return {'total_analyses': 0, 'avg_score': 0, 'best_score': 0}
-            
-            scores = [float(a.get('score', 0)) for a in analyses]
-            return {
-                'total_analyses': len(analyses),
-                'avg_score': round(sum(scores) / len(scores), 1) if scores else 0,
-                'best_score': max(scores) if scores else 0,
-                'recent_analyses': analyses[:5]
-            }
-        except Exception:
-            return {'total_analyses': 0, 'avg_score': 0, 'best_score': 0}
\ No newline at end of file
+        """Get user statistics from the incrementally maintained stats record."""
+        stats = self.stats_store.get(user_id)
+        if stats is None:
+            stats = self._rebuild_user_stats(user_id)
+        return stats.to_dict()
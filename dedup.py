@@ -0,0 +1,166 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Mersenne prime for universal hashing; inputs and coefficients stay below
+# 2**32 so a * x + b never overflows uint64.
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+WORD_PATTERN = re.compile(r"\w+")
+
+class MinHasher:
+    """MinHash signatures over word shingles of a document."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 42):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """32-bit hashes of the distinct word shingles of the text."""
+        words = WORD_PATTERN.findall(text.lower())
+        k = self.shingle_size
+        shingles = {' '.join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingle_hashes(text)
+        permuted = (self.a * hashes[None, :] + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=1)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """Signatures for many texts as an (n, num_perm) array."""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            result[i] = self.signature(text)
+        return result
+
+def estimated_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+def _any_pair_verified(signatures: np.ndarray, group: List[int], component: List[int], threshold: float) -> bool:
+    """Whether any document of `group` is a near-duplicate of any of `component`.
+
+    Representatives are compared first, so a group that matches the
+    component's first member costs one vectorized comparison.
+    """
+    group_signatures = signatures[group]
+    if (group_signatures == signatures[component[0]]).mean(axis=1).max() >= threshold:
+        return True
+    if len(component) == 1:
+        return False
+    component_signatures = signatures[component[1:]]
+    for signature in group_signatures:
+        if (component_signatures == signature).mean(axis=1).max() >= threshold:
+            return True
+    return False
+
+def lsh_clusters(signatures: np.ndarray, bands: int = 16, threshold: float = 0.8) -> np.ndarray:
+    """Group near-duplicate documents using banded LSH.
+
+    Documents sharing any band bucket are candidates, verified on the full
+    signature and merged with union-find. Within a bucket, members are first
+    grouped by the component they already belong to; pairs inside one
+    component are never compared, and two components merge as soon as one
+    pair between them verifies. Clusters are the same as verifying every
+    pair, but re-uploaded copies cost one comparison each. Returns, per
+    document, the index of its cluster's representative (the lowest index
+    in the cluster).
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"{num_perm} permutations cannot be split into {bands} bands")
+    rows = num_perm // bands
+
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        band_slice = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(n):
+            buckets[band_slice[i].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            groups = defaultdict(list)
+            for i in members:
+                groups[find(i)].append(i)
+            if len(groups) < 2:
+                continue
+            components = []  # members of this bucket, by component merged so far
+            for group in groups.values():
+                merged, remaining = group, []
+                for component in components:
+                    if _any_pair_verified(signatures, group, component, threshold):
+                        union(group[0], component[0])
+                        # Grow the larger list so repeated merges stay linear
+                        if len(component) > len(merged):
+                            merged, component = component, merged
+                        merged.extend(component)
+                    else:
+                        remaining.append(component)
+                components = remaining + [merged]
+
+    return np.array([find(i) for i in range(n)])
+
+def find_duplicates(signatures: np.ndarray, bands: int = 16, threshold: float = 0.8) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (keep_mask, cluster_ids): one representative is kept per cluster."""
+    clusters = lsh_clusters(signatures, bands=bands, threshold=threshold)
+    keep = clusters == np.arange(len(clusters))
+    return keep, clusters
+
+# --- Upload fingerprints ---
+def content_hash(text: str) -> str:
+    """SHA-256 of the text with whitespace runs collapsed, so re-flowed copies match."""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over weighted word shingles; similar texts differ in few bits."""
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = Counter(' '.join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1)))
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big') for s in shingles],
+                      dtype=np.uint64)
+    weights = np.array(list(shingles.values()), dtype=np.int64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = (np.where(bits == 1, 1, -1) * weights[:, None]).sum(axis=0)
+    return int(sum(1 << bit for bit in range(64) if votes[bit] > 0))
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def content_fingerprint(text: str) -> Dict[str, str]:
+    return {'content_hash': content_hash(text), 'simhash': format(simhash(text), '016x')}
+
+def find_matching_analysis(candidates: List[Dict[str, Any]], fingerprint: Dict[str, str],
+                           max_distance: int) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Find a prior analysis of the same content.
+
+    Returns ('exact', candidate) on a content-hash match, ('near', candidate)
+    for the closest SimHash within `max_distance` bits, else (None, None).
+    """
+    target = int(fingerprint['simhash'], 16)
+    best, best_distance = None, max_distance + 1
+    for candidate in candidates:
+        if candidate.get('content_hash') == fingerprint['content_hash']:
+            return 'exact', candidate
+        if candidate.get('simhash'):
+            distance = hamming_distance(target, int(candidate['simhash'], 16))
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+    return ('near', best) if best is not None else (None, None)
@@ -0,0 +1,74 @@
+import re
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+from typing import Dict, List, Any, Optional
+from config import config
+from nlp_utils import preprocess_text, sentiment_scores, readability_score, analyze_sections
+
+# Bump whenever the meaning or order of any feature changes; stored
+# vectors with a different version must be re-featurized before use.
+FEATURE_VERSION = 2
+
+def _section_feature_name(section_name: str) -> str:
+    return 'section_' + re.sub(r'[^a-z0-9]+', '_', section_name.lower()).strip('_')
+
+DENSE_FEATURE_NAMES = ['sentiment', 'readability', 'length'] + [
+    _section_feature_name(section['name']) for section in config.analysis.SECTION_CRITERIA
+]
+
+def featurize(text: str, basic: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the versioned feature record for one pitch.
+
+    `basic` may be the 'basic' block of comprehensive_analysis for the same
+    text, in which case its sentiment, readability and section scores are
+    reused instead of being recomputed.
+    """
+    if basic is None:
+        _, _, _, _, section_scores = analyze_sections(text)
+        sentiment = sentiment_scores(text)
+        readability = readability_score(text)
+    else:
+        section_scores = basic['section_scores']
+        sentiment = basic['sentiment']
+        readability = basic['readability']
+
+    dense = [float(sentiment.get('compound', 0)), float(readability), float(len(text.split()))]
+    dense.extend(float(section_scores.get(section['name'], 0)) for section in config.analysis.SECTION_CRITERIA)
+
+    return {
+        'version': FEATURE_VERSION,
+        'tokens': preprocess_text(text),
+        'dense': dense
+    }
+
+def stored_feature_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The feature record kept with a saved analysis.
+
+    Tokens are kept next to the dense features so saved analyses can be
+    re-scored, indexed or used for training without re-tokenizing; the
+    compressed payload keeps them cheap.
+    """
+    return {'version': record['version'], 'tokens': record['tokens'], 'dense': list(record['dense'])}
+
+def input_width(vectorizer) -> int:
+    """Columns of the model input matrix built with `vectorizer`."""
+    vocabulary = getattr(vectorizer, 'vocabulary_', None)
+    text_width = len(vocabulary) if vocabulary is not None else vectorizer.n_features
+    return text_width + len(DENSE_FEATURE_NAMES)
+
+def check_feature_version(record: Dict[str, Any]):
+    """Raise if a stored feature record was built by a different featurizer version."""
+    if record.get('version') != FEATURE_VERSION:
+        raise ValueError(f"Feature record version {record.get('version')} does not match featurizer version {FEATURE_VERSION}")
+
+def dense_matrix(records: List[Dict[str, Any]]) -> np.ndarray:
+    """Stack the dense features of many records into an (n, d) array."""
+    for record in records:
+        check_feature_version(record)
+    return np.array([record['dense'] for record in records], dtype=np.float64).reshape(len(records), len(DENSE_FEATURE_NAMES))
+
+def feature_matrix(records: List[Dict[str, Any]], vectorizer):
+    """Build the model input matrix: vectorized tokens followed by dense features."""
+    X_dense = dense_matrix(records)
+    X_text = vectorizer.transform([record['tokens'] for record in records])
+    return hstack([X_text, csr_matrix(X_dense)]).tocsr()
@@ -1,4 +1,6 @@
 import streamlit as st
+import json
+import uuid
 from typing import Dict, Any
 import requests
 
@@ -152,8 +154,15 @@ def render_figma_main_content():
     """
     import streamlit as st
     from file_validator import validate_file_upload
-    from text_extractor import extract_text
-    from nlp_utils import comprehensive_analysis
+    from text_extractor import extract_pages
+    from nlp_utils import slide_coverage
+    from performance_optimizer import comprehensive_analysis_cached
+    from model_service import predict_quality
+    from featurizer import featurize
+    from nlp_utils import preprocess_text
+    from advanced_analytics import advanced_analyzer
+    from dedup import content_fingerprint, find_matching_analysis
+    from config import config
     from figma_ui_fixed import render_figma_analysis_results, render_figma_success
     from datetime import datetime
 
@@ -335,57 +344,70 @@ def render_figma_main_content():
             return
         filetype = '.' + safe_filename.split('.')[-1].lower()
         with st.spinner("Extracting text from your file..."):
-            text = extract_text(uploaded_file, filetype)
+            pages = extract_pages(uploaded_file, filetype)
+            text = " ".join(page for page in pages if page)
         if not text or len(text.strip()) < 50:
             st.error("Could not extract enough text from your file. Please upload a valid pitch deck.")
             return
-        with st.spinner("Analyzing your pitch deck with AI..."):
-            analysis = comprehensive_analysis(text)
-        # --- Save analysis to Supabase ---
-        try:
-            db_service = st.session_state.get('db_service')
-            user = st.session_state.get('current_user')
-            
-            # Try multiple ways to get user_id
-            user_id = None
-            if user:
-                if isinstance(user, dict):
-                    user_id = user.get('id') or user.get('user_id')
-                else:
-                    user_id = getattr(user, 'id', None) or getattr(user, 'user_id', None)
-            
-            if db_service and user_id and uploaded_file:
-                # Prepare analysis data with proper structure
-                analysis_data = {
-                    "filename": uploaded_file.name,
-                    "score": analysis['basic']['score'],
-                    "readability_score": analysis['basic']['readability'],
-                    "sentiment": analysis['basic']['sentiment'],
-                    "grade": analysis['overall_grade'],
-                    "overall_score": int((analysis['basic']['score']/10)*100),
-                    "strengths": analysis['basic']['strengths'],
-                    "weaknesses": analysis['basic']['weaknesses'],
-                    "tips": analysis['basic']['tips'],
-                    "keywords": analysis['basic']['keywords'],
-                    "recommendations": analysis.get('recommendations', []),
-                    "full_analysis": analysis
-                }
-                
-                result = db_service.save_analysis(user_id, analysis_data)
-                
-                if result:
-                    st.success("✅ Analysis saved to your history!")
-                    # Force refresh analyses in session state
-                    st.session_state.analyses = db_service.get_user_analyses(user_id)
-                    # Trigger a rerun to refresh the sidebar
+        # --- Skip re-analysis of content we have already analyzed ---
+        user = st.session_state.get('current_user')
+        user_id = current_user_id()
+        fingerprint = content_fingerprint(text)
+        match_type, match = find_matching_analysis(known_analyses(), fingerprint,
+                                                   config.analysis.NEAR_DUPLICATE_MAX_DISTANCE)
+        if match_type is None:
+            match = find_saved_by_content_hash(user_id, fingerprint['content_hash'])
+            match_type = 'exact' if match else None
+        reuse = None
+        if match_type == 'exact':
+            reuse = match
+            # The rerun right after a save lands here too; only announce genuine re-uploads
+            if not match.pop('just_saved', False):
+                st.info(f"♻️ You already analyzed this pitch as '{match['filename']}'. Showing the saved result.")
+        elif match_type == 'near':
+            choice_key = f"near_match_choice_{fingerprint['content_hash']}"
+            choice = st.session_state.get(choice_key)
+            if choice is None:
+                st.info(f"♻️ This pitch is nearly identical to '{match['filename']}', which you analyzed before.")
+                col1, col2 = st.columns(2)
+                if col1.button("Show saved result", key=f"{choice_key}_reuse"):
+                    st.session_state[choice_key] = 'reuse'
                     st.rerun()
-                else:
-                    st.warning("⚠️ Analysis completed but couldn't save to history")
-            else:
-                st.info("ℹ️ Analysis completed (not saved - database/user info unavailable)")
-                
-        except Exception as e:
-            st.warning(f"⚠️ Analysis completed but save failed: {str(e)}")
+                if col2.button("Analyze anyway", key=f"{choice_key}_analyze"):
+                    st.session_state[choice_key] = 'analyze'
+                    st.rerun()
+                return uploaded_file
+            if choice == 'reuse':
+                reuse = match
+        if reuse and reuse.get('analysis') is None:
+            # History rows carry only list columns; fetch the full analysis now that it is needed
+            reuse = saved_candidate(load_saved_analysis(user_id, reuse['id']))
+            if reuse and reuse.get('analysis') is None:
+                reuse = None
+
+        saved_id = None
+        pending_save_id = None
+        if reuse:
+            analysis = reuse['analysis']
+            feature_vector = reuse['feature_vector']
+            saved_id = reuse.get('id')
+            pending_save_id = reuse.get('pending_save_id')
+            if reuse.pop('save_failed', False):
+                st.warning("⚠️ Analysis completed but couldn't save to history")
+            if 'slide_coverage' not in analysis:
+                analysis['slide_coverage'] = slide_coverage(pages)
+            benchmark = advanced_analyzer.benchmark_against_corpus(analysis)
+        else:
+            with st.spinner("Analyzing your pitch deck with AI..."):
+                analysis = comprehensive_analysis_cached(text)
+                analysis['slide_coverage'] = slide_coverage(pages)
+                feature_vector = featurize(text, analysis['basic'])
+                ml_prediction = predict_quality(text, feature_vector)
+                if ml_prediction:
+                    analysis['ml_prediction'] = ml_prediction
+                benchmark = advanced_analyzer.benchmark_against_corpus(analysis)
+            remember_analysis(uploaded_file.name, fingerprint, analysis, feature_vector)
+            pending_save_id = queue_analysis_save(uploaded_file, user_id, analysis, feature_vector, fingerprint)
         # --- Render results as before ---
         basic = analysis['basic']
         render_figma_analysis_results(
@@ -400,9 +422,273 @@ def render_figma_main_content():
             basic['keywords'],
             analysis.get('recommendations', [])
         )
+        if 'ml_prediction' in analysis:
+            st.caption(f"🤖 Model-predicted quality: {analysis['ml_prediction']['score']} "
+                       f"(scored in {analysis['ml_prediction']['latency_ms']:.0f}ms)")
+        overall_percentile = benchmark['percentiles'].get('overall_score')
+        if overall_percentile is not None:
+            st.caption(f"📈 You are in the {overall_percentile:.0f}th percentile of "
+                       f"{benchmark['corpus_size']} analyzed pitches "
+                       f"(readability: {benchmark['percentiles']['readability']:.0f}th, "
+                       f"sentiment: {benchmark['percentiles']['sentiment']:.0f}th)")
+        render_slide_coverage(analysis['slide_coverage'])
+        if pending_save_id:
+            render_save_status(pending_save_id, fingerprint['content_hash'])
+        # Analyses saved before tokens were stored carry none; re-derive them from the text
+        tokens = feature_vector.get('tokens') if feature_vector else None
+        render_similar_pitches(tokens or preprocess_text(text), user, user_id, saved_id)
         render_figma_success("Analysis Complete!", "Your pitch deck has been analyzed. See the insights above.")
+    elif st.session_state.get('open_analysis_id'):
+        render_saved_analysis(current_user_id(), st.session_state.open_analysis_id)
     return uploaded_file
 
+def current_user_id():
+    user = st.session_state.get('current_user')
+    if not user:
+        return None
+    if isinstance(user, dict):
+        return user.get('id') or user.get('user_id')
+    return getattr(user, 'id', None) or getattr(user, 'user_id', None)
+
+def saved_candidate(row):
+    """Match candidate for a saved row; list rows leave 'analysis' as None until it is loaded."""
+    if not row:
+        return None
+    data = row.get('analysis_data') if isinstance(row.get('analysis_data'), dict) else {}
+    content_hash = row.get('content_hash') or data.get('content_hash')
+    if not content_hash:
+        return None
+    return {
+        'id': row.get('id'),
+        'filename': row.get('filename') or data.get('filename', 'Unknown'),
+        'content_hash': content_hash,
+        'simhash': row.get('simhash') or data.get('simhash'),
+        'analysis': data.get('full_analysis'),
+        'feature_vector': data.get('feature_vector')
+    }
+
+def known_analyses():
+    """Prior analyses an upload can be matched against: this session's, then loaded history."""
+    known = list(st.session_state.get('analysis_fingerprints', {}).values())
+    for row in st.session_state.get('analyses') or []:
+        candidate = saved_candidate(row)
+        if candidate:
+            known.append(candidate)
+    return known
+
+def find_saved_by_content_hash(user_id, content_hash):
+    """Exact match anywhere in the user's history, beyond the loaded pages."""
+    db_service = st.session_state.get('db_service')
+    if not db_service or not user_id:
+        return None
+    try:
+        return saved_candidate(db_service.find_analysis_by_content_hash(user_id, content_hash))
+    except Exception as e:
+        from error_handler import error_handler
+        error_handler.logger.warning(f"Content hash lookup failed: {str(e)}")
+        return None
+
+def load_saved_analysis(user_id, analysis_id):
+    """Full row of a saved analysis, fetched once per session."""
+    opened = st.session_state.setdefault('opened_analyses', {})
+    if analysis_id not in opened:
+        db_service = st.session_state.get('db_service')
+        if not db_service or not user_id:
+            return None
+        try:
+            opened[analysis_id] = db_service.get_analysis(user_id, analysis_id)
+        except Exception:
+            return None
+    return opened[analysis_id]
+
+def _stored_list(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return []
+    return value or []
+
+def render_saved_analysis(user_id, analysis_id):
+    """Show an analysis opened from the history sidebar."""
+    row = load_saved_analysis(user_id, analysis_id)
+    if not row or row.get('analysis_error'):
+        reason = f": {row['analysis_error']}" if row else "."
+        st.error(f"That analysis could not be loaded{reason}")
+        st.session_state.open_analysis_id = None
+        return
+    data = row['analysis_data'] if isinstance(row.get('analysis_data'), dict) else row
+    st.markdown(f"### 📄 {data.get('filename') or row.get('filename', 'Saved analysis')}")
+    if st.button("Close", key="close_saved_analysis"):
+        st.session_state.open_analysis_id = None
+        st.rerun()
+    render_figma_analysis_results(
+        data.get('score', 0),
+        data.get('readability_score', 0),
+        data.get('sentiment') if isinstance(data.get('sentiment'), dict) else {'compound': 0},
+        data.get('grade', 'N/A'),
+        data.get('overall_score', 0),
+        _stored_list(data.get('strengths')),
+        _stored_list(data.get('weaknesses')),
+        _stored_list(data.get('tips')),
+        _stored_list(data.get('keywords')),
+        _stored_list(data.get('recommendations'))
+    )
+    full_analysis = data.get('full_analysis') or {}
+    if full_analysis.get('slide_coverage'):
+        render_slide_coverage(full_analysis['slide_coverage'])
+
+def remember_analysis(filename, fingerprint, analysis, feature_vector, analysis_id=None, pending_save_id=None):
+    """Keep an analysis in the session so re-uploads of the same content are not recomputed."""
+    if 'analysis_fingerprints' not in st.session_state:
+        st.session_state.analysis_fingerprints = {}
+    st.session_state.analysis_fingerprints[fingerprint['content_hash']] = {
+        'id': analysis_id,
+        'just_saved': analysis_id is not None,
+        'pending_save_id': pending_save_id,
+        'filename': filename,
+        **fingerprint,
+        'analysis': analysis,
+        'feature_vector': feature_vector
+    }
+
+def build_analysis_data(filename, analysis, feature_vector, fingerprint):
+    """The stored form of an analysis."""
+    from featurizer import stored_feature_record
+    return {
+        "filename": filename,
+        "score": analysis['basic']['score'],
+        "readability_score": analysis['basic']['readability'],
+        "sentiment": analysis['basic']['sentiment'],
+        "grade": analysis['overall_grade'],
+        "overall_score": int((analysis['basic']['score']/10)*100),
+        "strengths": analysis['basic']['strengths'],
+        "weaknesses": analysis['basic']['weaknesses'],
+        "tips": analysis['basic']['tips'],
+        "keywords": analysis['basic']['keywords'],
+        "recommendations": analysis.get('recommendations', []),
+        "ml_score": analysis.get('ml_prediction', {}).get('score'),
+        "feature_vector": stored_feature_record(feature_vector) if feature_vector else None,
+        "content_hash": fingerprint['content_hash'],
+        "simhash": fingerprint['simhash'],
+        "full_analysis": analysis
+    }
+
+def queue_analysis_save(uploaded_file, user_id, analysis, feature_vector, fingerprint):
+    """Hand the save to the background worker and return its analysis id.
+
+    Falls back to saving synchronously if the queue is full; returns None
+    when nothing is pending.
+    """
+    from persistence_queue import get_persistence_queue
+
+    db_service = st.session_state.get('db_service')
+    if not (db_service and user_id and uploaded_file):
+        st.info("ℹ️ Analysis completed (not saved - database/user info unavailable)")
+        return None
+    analysis_id = str(uuid.uuid4())
+    analysis_data = build_analysis_data(uploaded_file.name, analysis, feature_vector, fingerprint)
+    analysis_data['analysis_id'] = analysis_id
+    if not get_persistence_queue().submit(db_service, user_id, analysis_id, analysis_data):
+        save_analysis_result(uploaded_file, user_id, analysis, feature_vector, fingerprint)
+        return None
+    remember_analysis(uploaded_file.name, fingerprint, analysis, feature_vector, pending_save_id=analysis_id)
+    return analysis_id
+
+def render_save_status(analysis_id, content_hash):
+    """Show the background save's progress; rerun once it finishes so the sidebar picks it up."""
+    from persistence_queue import get_persistence_queue
+
+    def show_status():
+        status = get_persistence_queue().status(analysis_id) or {'state': 'failed'}
+        entry = st.session_state.get('analysis_fingerprints', {}).get(content_hash)
+        if status['state'] in ('saved', 'failed') and entry and entry.get('pending_save_id') == analysis_id:
+            entry['pending_save_id'] = None
+            if status['state'] == 'saved':
+                entry['id'] = status.get('saved_id')
+                entry['just_saved'] = True
+            else:
+                entry['save_failed'] = True
+            st.rerun()
+        elif status['state'] == 'retrying':
+            st.caption(f"💾 Saving to your history… retrying in {status.get('retry_in')}s")
+        else:
+            st.caption("💾 Saving to your history…")
+
+    fragment = getattr(st, 'fragment', None)
+    if fragment is None:
+        show_status()  # Streamlit without fragments: status updates on the next interaction
+    else:
+        fragment(run_every=1.0)(show_status)()
+
+def save_analysis_result(uploaded_file, user_id, analysis, feature_vector, fingerprint):
+    """Save a new analysis to the user's history synchronously; return the saved row id, if any."""
+    from corpus_benchmark import record_for_benchmark
+    from similarity_index import index_analysis
+
+    saved_id = None
+    try:
+        db_service = st.session_state.get('db_service')
+        
+        if db_service and user_id and uploaded_file:
+            analysis_data = build_analysis_data(uploaded_file.name, analysis, feature_vector, fingerprint)
+            result = db_service.save_analysis(user_id, analysis_data)
+            
+            if result:
+                record_for_benchmark(analysis)
+                saved_id = result.get('id') if isinstance(result, dict) else None
+                index_analysis(saved_id, user_id, analysis_data)
+                remember_analysis(uploaded_file.name, fingerprint, analysis, feature_vector, saved_id)
+                st.success("✅ Analysis saved to your history!")
+                # save_analysis wrote the row through to the history cache; rerun to refresh the sidebar
+                st.rerun()
+            else:
+                st.warning("⚠️ Analysis completed but couldn't save to history")
+        else:
+            st.info("ℹ️ Analysis completed (not saved - database/user info unavailable)")
+            
+    except Exception as e:
+        st.warning(f"⚠️ Analysis completed but save failed: {str(e)}")
+    return saved_id
+
+def render_slide_coverage(coverage):
+    """Heatmap of section keyword hits per slide; skipped for single-page documents."""
+    import plotly.graph_objects as go
+
+    matrix = coverage['matrix']
+    if len(matrix) < 2:
+        return
+    with st.expander("🗂️ Section coverage by slide"):
+        fig = go.Figure(go.Heatmap(
+            z=matrix,
+            x=coverage['sections'],
+            y=[f"Slide {i}" for i in range(1, len(matrix) + 1)],
+            colorscale="Blues",
+            hovertemplate="%{y} · %{x}: %{z} hits<extra></extra>"
+        ))
+        fig.update_yaxes(autorange="reversed")
+        fig.update_layout(height=min(1200, 120 + 22 * len(matrix)), margin=dict(l=10, r=10, t=10, b=10))
+        st.plotly_chart(fig, use_container_width=True)
+
+def render_similar_pitches(tokens, user, user_id, exclude_id=None):
+    """List the most similar saved pitches: the user's own, plus all users' for admins."""
+    from similarity_index import find_similar_pitches, backfill_user_index
+    from auth_handler import is_admin
+
+    groups = []
+    if user_id:
+        backfill_user_index(user_id, st.session_state.get('db_service'))
+        groups.append(("Similar pitches in your history", find_similar_pitches(tokens, user_id=user_id, exclude_id=exclude_id)))
+    if is_admin(user):
+        groups.append(("Similar pitches across all users", find_similar_pitches(tokens, exclude_id=exclude_id)))
+
+    for title, matches in groups:
+        if not matches:
+            continue
+        with st.expander(f"🔎 {title}"):
+            for match in matches:
+                st.markdown(f"- **{match['filename']}** — {match['similarity'] * 100:.0f}% similar")
+
 def render_figma_analysis_results(score, read_score, sentiment, grade, overall_score, strengths, weaknesses, tips, keywords, recommendations):
     """Render analysis results with improved design and theme support."""
     # Get theme from session state
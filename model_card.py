@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from config import config
+from featurizer import FEATURE_VERSION
+from model_service import load_artifacts
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 4)
+
+def build_model_card(model_path: str, vectorizer_path: str, X_test, y_test,
+                     training_seconds: float, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Measure the served artifacts and describe them in a model card.
+
+    Latency and throughput are measured on the model as the app loads it,
+    using rows of the held-out feature matrix.
+    """
+    size_bytes = os.path.getsize(model_path) + os.path.getsize(vectorizer_path)
+
+    start = time.perf_counter()
+    model = load_artifacts(model_path, vectorizer_path).model
+    load_seconds = time.perf_counter() - start
+
+    model.predict(X_test[:1])  # warm-up
+    samples = min(X_test.shape[0], config.model.CARD_LATENCY_SAMPLES)
+    timings = []
+    for i in range(samples):
+        start = time.perf_counter()
+        model.predict(X_test[i:i + 1])
+        timings.append(time.perf_counter() - start)
+
+    batch = X_test[:config.model.CARD_BATCH_SIZE]
+    start = time.perf_counter()
+    model.predict(batch)
+    batch_seconds = time.perf_counter() - start
+
+    predictions = model.predict(X_test)
+    card = {
+        'created_at': datetime.now().isoformat(),
+        'model_path': model_path,
+        'feature_version': FEATURE_VERSION,
+        'training_seconds': round(training_seconds, 2),
+        'size_bytes': size_bytes,
+        'load_ms': _ms(load_seconds),
+        'latency_ms': {
+            'p50': _ms(float(np.percentile(timings, 50))),
+            'p99': _ms(float(np.percentile(timings, 99)))
+        },
+        'batch_throughput_per_s': round(batch.shape[0] / batch_seconds, 1) if batch_seconds > 0 else None,
+        'accuracy': {
+            'mse': round(float(mean_squared_error(y_test, predictions)), 4),
+            'mae': round(float(mean_absolute_error(y_test, predictions)), 4),
+            'r2': round(float(r2_score(y_test, predictions)), 4)
+        },
+        'test_rows': int(X_test.shape[0])
+    }
+    if extra:
+        card.update(extra)
+    return card
+
+def save_model_card(card: Dict[str, Any], path: str):
+    with open(path, 'w') as f:
+        json.dump(card, f, indent=2, default=str)
+
+def load_model_card(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def check_model_card(new: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Compare a new model card with the current one; return any budget violations."""
+    violations = []
+    budgets = config.model
+
+    for percentile in ('p50', 'p99'):
+        new_ms = new['latency_ms'][percentile]
+        current_ms = current['latency_ms'][percentile]
+        if new_ms - current_ms > budgets.LATENCY_NOISE_MS and new_ms > current_ms * budgets.MAX_LATENCY_REGRESSION:
+            violations.append(f"{percentile} latency {new_ms}ms exceeds {budgets.MAX_LATENCY_REGRESSION}x "
+                              f"the current {current_ms}ms")
+
+    if new['load_ms'] > current['load_ms'] * budgets.MAX_LOAD_TIME_REGRESSION:
+        violations.append(f"Load time {new['load_ms']}ms exceeds {budgets.MAX_LOAD_TIME_REGRESSION}x "
+                          f"the current {current['load_ms']}ms")
+
+    if new['size_bytes'] > current['size_bytes'] * budgets.MAX_SIZE_REGRESSION:
+        violations.append(f"Model size {new['size_bytes']} bytes exceeds {budgets.MAX_SIZE_REGRESSION}x "
+                          f"the current {current['size_bytes']} bytes")
+
+    return violations
+
+if __name__ == "__main__":
+    # Usage: python model_card.py new_card.json current_card.json
+    if len(sys.argv) != 3:
+        print("Usage: python model_card.py <new_card.json> <current_card.json>")
+        sys.exit(2)
+    violations = check_model_card(load_model_card(sys.argv[1]), load_model_card(sys.argv[2]))
+    for violation in violations:
+        print(f"❌ {violation}")
+    if violations:
+        sys.exit(1)
+    print("✅ Model is within latency and size budgets")
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import joblib
+import streamlit as st
+from typing import Dict, List, Optional, Any
+from config import config
+from error_handler import error_handler
+from compact_forest import CompactForest
+from featurizer import featurize, feature_matrix, input_width, FEATURE_VERSION
+
+class PitchQualityModel:
+    """Serve predictions from the model trained by train_model.py on featurizer records."""
+
+    def __init__(self, model, vectorizer):
+        self.model = model
+        self.vectorizer = vectorizer
+
+    def predict_records(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Predict quality scores from stored feature records in a single model call."""
+        start = time.perf_counter()
+        if not records:
+            return {'scores': [], 'latency_ms': 0.0}
+
+        scores = self.model.predict(feature_matrix(records, self.vectorizer))
+        latency_ms = (time.perf_counter() - start) * 1000
+        return {
+            'scores': [round(float(score), 2) for score in scores],
+            'latency_ms': round(latency_ms, 2)
+        }
+
+    def check_compatible(self):
+        """Raise if the model was trained on a different feature layout than the featurizer builds."""
+        expected = input_width(self.vectorizer)
+        trained = getattr(self.model, 'n_features_in_', None) or getattr(self.model, 'n_features', None)
+        if trained is not None and int(trained) != expected:
+            raise ValueError(f"the model expects {trained} features but feature version {FEATURE_VERSION} "
+                             f"builds {expected}; retrain it with train_model.py")
+
+    def predict(self, text: str, record: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Predict the quality score of a single pitch, reusing its feature record if given."""
+        result = self.predict_records([record if record is not None else featurize(text)])
+        return {'score': result['scores'][0], 'latency_ms': result['latency_ms']}
+
+def served_model_path() -> str:
+    """The model artifact the app serves: the compact forest if exported, else the pickle."""
+    if os.path.exists(config.model.COMPACT_MODEL_PATH):
+        return config.model.COMPACT_MODEL_PATH
+    return config.model.MODEL_PATH
+
+def load_artifacts(model_path: str, vectorizer_path: str) -> PitchQualityModel:
+    """Load a model and vectorizer from disk, without caching.
+
+    `.npz` paths are compact forests; anything else is a joblib pickle,
+    loaded with memory-mapped arrays.
+    """
+    if model_path.endswith('.npz'):
+        model = CompactForest.load(model_path)
+    else:
+        model = joblib.load(model_path, mmap_mode='r')
+    vectorizer = joblib.load(vectorizer_path, mmap_mode='r')
+    return PitchQualityModel(model, vectorizer)
+
+def _card_feature_version() -> Optional[int]:
+    """The feature version recorded in the model card, if there is one."""
+    try:
+        with open(config.model.MODEL_CARD_PATH) as f:
+            return json.load(f).get('feature_version')
+    except (OSError, ValueError):
+        return None
+
+# Why the served model was refused; logged, and shown in the debug panel
+_model_status = {'error': None}
+
+def quality_model_error() -> Optional[str]:
+    return _model_status['error']
+
+@st.cache_resource(show_spinner=False)
+def load_quality_model() -> Optional[PitchQualityModel]:
+    """Load the served model and vectorizer once per process; refuse one built for other features."""
+    paths = [served_model_path(), config.model.VECTORIZER_PATH]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        error_handler.logger.warning(f"Quality model unavailable, missing: {', '.join(missing)}")
+        return None
+
+    try:
+        start = time.perf_counter()
+        quality_model = load_artifacts(*paths)
+        card_version = _card_feature_version()
+        if card_version is not None and card_version != FEATURE_VERSION:
+            raise ValueError(f"the model was trained on feature version {card_version}, "
+                             f"the featurizer is version {FEATURE_VERSION}; retrain it with train_model.py")
+        quality_model.check_compatible()
+        error_handler.logger.info(f"Quality model loaded in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return quality_model
+    except Exception as e:
+        _model_status['error'] = str(e)
+        error_handler.logger.error(f"Refusing to serve quality model: {str(e)}")
+        return None
+
+def predict_quality(text: str, record: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, float]]:
+    """Predict a pitch quality score, or None if the model is unavailable."""
+    if not config.model.ENABLE_ML_SCORING:
+        return None
+    model = load_quality_model()
+    if model is None:
+        return None
+    try:
+        prediction = model.predict(text, record)
+        error_handler.logger.info(f"Quality prediction took {prediction['latency_ms']}ms")
+        return prediction
+    except Exception as e:
+        error_handler.logger.warning(f"Quality prediction failed: {str(e)}")
+        return None
+
+def rescore_analyses(analyses: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Re-score saved analyses from their stored feature vectors in one model call.
+
+    Scores are keyed by analysis id; analyses without a feature vector of the
+    current FEATURE_VERSION, or saved before tokens were stored, are skipped.
+    """
+    if not config.model.ENABLE_ML_SCORING:
+        return None
+    model = load_quality_model()
+    if model is None:
+        return None
+
+    ids, records = [], []
+    for analysis in analyses:
+        data = analysis.get('analysis_data')
+        record = data.get('feature_vector') if isinstance(data, dict) else None
+        if record and record.get('version') == FEATURE_VERSION and record.get('tokens') is not None:
+            ids.append(analysis.get('id'))
+            records.append(record)
+
+    try:
+        result = model.predict_records(records)
+        return {'scores': dict(zip(ids, result['scores'])), 'latency_ms': result['latency_ms']}
+    except Exception as e:
+        error_handler.logger.warning(f"History re-scoring failed: {str(e)}")
+        return None
@@ -1,35 +1,42 @@
 import re
 import string
-import nltk
+import functools
 import numpy as np
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from nltk.sentiment import SentimentIntensityAnalyzer
 import textstat
-from typing import Dict, List, Tuple
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 from config import config
-
-# Download required NLTK data
-nltk.download('stopwords', quiet=True)
-nltk.download('wordnet', quiet=True)
-nltk.download('omw-1.4', quiet=True)
-nltk.download('vader_lexicon', quiet=True)
-nltk.download('punkt', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
+from quantity_parser import QuantityIndex
+from resources import get_stopwords, get_lemmatizer, get_sentiment_analyzer, sent_tokenize
 
 # --- Preprocessing ---
 def preprocess_text(text):
     text = text.lower()
     text = re.sub(r"\s+", " ", text)
     text = text.translate(str.maketrans('', '', string.punctuation))
-    stop_words = set(stopwords.words('english'))
-    lemmatizer = WordNetLemmatizer()
+    stop_words = get_stopwords()
+    lemmatizer = get_lemmatizer()
     words = text.split()
     words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
     return ' '.join(words)
 
+# --- Lexicon Scoring ---
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def token_frequencies(text: str) -> Counter:
+    """Build a token-frequency table for the text in a single pass."""
+    return Counter(TOKEN_PATTERN.findall(text.lower()))
+
+def score_lexicons(token_counts: Counter, lexicons: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+    """Count whole-token occurrences of every lexicon word via dictionary lookup."""
+    if lexicons is None:
+        lexicons = config.analysis.LEXICONS
+    return {
+        name: sum(token_counts.get(word, 0) for word in words)
+        for name, words in lexicons.items()
+    }
+
 # --- Keyword Extraction ---
 def extract_keywords(text, top_n=15):
     try:
@@ -42,8 +49,7 @@ def extract_keywords(text, top_n=15):
 
 # --- Sentiment Analysis ---
 def sentiment_scores(text):
-    sia = SentimentIntensityAnalyzer()
-    scores = sia.polarity_scores(text)
+    scores = get_sentiment_analyzer().polarity_scores(text)
     return scores  # dict: {'neg':..., 'neu':..., 'pos':..., 'compound':...}
 
 # --- Readability ---
@@ -106,7 +112,7 @@ def extract_financial_metrics(text: str) -> Dict[str, List[str]]:
 
 def analyze_pitch_structure(text: str) -> Dict[str, float]:
     """Analyze the structure and flow of the pitch."""
-    sentences = nltk.sent_tokenize(text)
+    sentences = sent_tokenize(text)
     
     structure_score = {
         'clarity': 0.0,
@@ -120,21 +126,16 @@ def analyze_pitch_structure(text: str) -> Dict[str, float]:
     structure_score['clarity'] = max(0, 100 - (avg_sentence_length - 15) * 2)  # Optimal ~15 words
     
     # Flow: Transition words and connectors
-    transition_words = ['however', 'therefore', 'furthermore', 'moreover', 'consequently', 
-                       'additionally', 'meanwhile', 'subsequently', 'thus', 'hence']
-    transition_count = sum(1 for word in transition_words if word in text.lower())
-    structure_score['flow'] = min(100, (transition_count / len(sentences)) * 100 * 10)
+    lexicon_counts = score_lexicons(token_frequencies(text))
+    structure_score['flow'] = min(100, (lexicon_counts['transition'] / len(sentences)) * 100 * 10)
     
     # Completeness: Based on section coverage
     _, _, _, _, section_scores = analyze_sections(text)
     structure_score['completeness'] = (sum(section_scores.values()) / len(section_scores)) * 100
     
     # Engagement: Action words and emotional language
-    action_words = ['achieve', 'deliver', 'create', 'build', 'develop', 'launch', 'scale', 'grow']
-    emotional_words = ['excited', 'passionate', 'innovative', 'revolutionary', 'breakthrough']
-    
-    action_count = sum(1 for word in action_words if word in text.lower())
-    emotional_count = sum(1 for word in emotional_words if word in text.lower())
+    action_count = lexicon_counts['action']
+    emotional_count = lexicon_counts['emotional']
     
     structure_score['engagement'] = min(100, ((action_count + emotional_count) / len(sentences)) * 100 * 5)
     
@@ -225,6 +226,49 @@ def analyze_sections(text):
     score = round((points / len(section_criteria)) * 10, 1)
     return score, strengths, weaknesses, actionable_tips, section_scores
 
+@functools.lru_cache(maxsize=1)
+def _section_keyword_index() -> Tuple[re.Pattern, Dict[str, List[int]]]:
+    """One alternation over every section keyword, and the sections each keyword belongs to."""
+    keyword_sections: Dict[str, List[int]] = {}
+    for i, section in enumerate(config.analysis.SECTION_CRITERIA):
+        for kw in section['keywords']:
+            sections = keyword_sections.setdefault(kw.lower(), [])
+            if i not in sections:
+                sections.append(i)
+    # Longest first, so multi-word keywords win over their own words
+    alternatives = sorted(keyword_sections, key=len, reverse=True)
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(kw) for kw in alternatives) + r')\b', re.IGNORECASE)
+    return pattern, keyword_sections
+
+def slide_section_matrix(pages: List[str]) -> np.ndarray:
+    """Section keyword hits per slide/page as a (pages × sections) count matrix.
+
+    All pages are scanned once as a single string; each hit is assigned to its
+    page by offset with a binary search.
+    """
+    pattern, keyword_sections = _section_keyword_index()
+    matrix = np.zeros((len(pages), len(config.analysis.SECTION_CRITERIA)), dtype=np.int32)
+    if not pages:
+        return matrix
+
+    page_ends = np.cumsum([len(page) + 1 for page in pages])
+    positions, sections = [], []
+    for match in pattern.finditer('\n'.join(pages)):
+        for section in keyword_sections[match.group(0).lower()]:
+            positions.append(match.start())
+            sections.append(section)
+    if positions:
+        rows = np.searchsorted(page_ends, positions, side='right')
+        np.add.at(matrix, (rows, sections), 1)
+    return matrix
+
+def slide_coverage(pages: List[str]) -> Dict[str, list]:
+    """JSON-safe per-slide section coverage, for storing with an analysis."""
+    return {
+        'sections': [section['name'] for section in config.analysis.SECTION_CRITERIA],
+        'matrix': slide_section_matrix(pages).tolist()
+    }
+
 def comprehensive_analysis(text: str) -> Dict[str, any]:
     """Comprehensive pitch analysis with all enhanced features."""
     analysis = {}
@@ -237,6 +281,7 @@ def comprehensive_analysis(text: str) -> Dict[str, any]:
     
     # Enhanced analysis
     financial_metrics = extract_financial_metrics(text)
+    quantities = QuantityIndex.from_text(text)
     structure_analysis = analyze_pitch_structure(text)
     competitive_advantages = extract_competitive_advantages(text)
     market_analysis = analyze_market_opportunity(text)
@@ -254,6 +299,7 @@ def comprehensive_analysis(text: str) -> Dict[str, any]:
             'keywords': keywords
         },
         'financial': financial_metrics,
+        'quantities': quantities.to_dict(),
         'structure': structure_analysis,
         'competitive': competitive_advantages,
         'market': market_analysis,
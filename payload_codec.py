@@ -0,0 +1,176 @@
+import json
+import zlib
+import base64
+from typing import Dict, Any
+
+# Try to import msgpack and zstandard, fallback to JSON and zlib if not available
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Stored payloads are [version byte][codec byte][compressed field map]
+PAYLOAD_VERSION = 1
+CODEC_MSGPACK_ZLIB = 1
+CODEC_MSGPACK_ZSTD = 2
+CODEC_JSON_ZLIB = 3
+# Marks an encoded payload in a text column; older rows hold plain JSON there
+TEXT_PREFIX = "b64:"
+
+class _Packed:
+    """A payload field still in its serialized form."""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __repr__(self):
+        return f"<packed {len(self.data)} bytes>"
+
+def _unpack_field(codec: int, data) -> Any:
+    if codec == CODEC_JSON_ZLIB:
+        return json.loads(data)
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+class LazyPayload(dict):
+    """An analysis payload whose fields are deserialized the first time they are read.
+
+    Every field is packed on its own, so reading 'filename' or 'content_hash'
+    never unpacks 'full_analysis'. It subclasses dict, so isinstance checks,
+    .get() and json.dumps work unchanged, and every overridden read unpacks
+    what it returns. Calling dict's own methods on it directly (e.g.
+    `dict.values(payload)`) bypasses the overrides and can return packed
+    fields; use `copy()` for a plain, fully unpacked dict.
+    """
+
+    def __init__(self, fields: Dict[str, Any], codec: int):
+        super().__init__((key, _Packed(value)) for key, value in fields.items())
+        self.codec = codec
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, _Packed):
+            value = _unpack_field(self.codec, value.data)
+            super().__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key = next(reversed(super().keys()), None)
+        if key is not None:
+            self[key]
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return super().setdefault(key, default)
+
+    def _unpack_all(self):
+        for key in list(super().keys()):
+            self[key]
+
+    def items(self):
+        self._unpack_all()
+        return super().items()
+
+    def values(self):
+        self._unpack_all()
+        return super().values()
+
+    def copy(self) -> Dict[str, Any]:
+        """A plain dict with every field unpacked."""
+        self._unpack_all()
+        return dict(super().items())
+
+    def __iter__(self):
+        # Overriding iteration stops dict(payload) and {**payload} from copying packed values
+        return super().__iter__()
+
+    def __eq__(self, other):
+        self._unpack_all()
+        if isinstance(other, LazyPayload):
+            other._unpack_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        self._unpack_all()
+        return super().__repr__()
+
+    __hash__ = None
+
+def encode_payload(data: Dict[str, Any], compression: str = "zlib") -> bytes:
+    """Pack each field separately, then compress the field map behind a version and codec header.
+
+    `compression` is 'zlib' or 'zstd'. It is a deployment setting, not a
+    runtime probe: every host reading the rows needs the same libraries.
+    """
+    if compression not in ("zlib", "zstd"):
+        raise ValueError(f"Unknown analysis payload compression: {compression}")
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        raise ValueError("Payload compression 'zstd' needs the zstandard package")
+    if MSGPACK_AVAILABLE:
+        codec = CODEC_MSGPACK_ZSTD if compression == "zstd" else CODEC_MSGPACK_ZLIB
+        body = msgpack.packb({key: msgpack.packb(value, use_bin_type=True) for key, value in data.items()},
+                             use_bin_type=True)
+    else:
+        codec = CODEC_JSON_ZLIB
+        body = json.dumps({key: json.dumps(value) for key, value in data.items()}).encode('utf-8')
+    if codec == CODEC_MSGPACK_ZSTD:
+        compressed = zstandard.ZstdCompressor().compress(body)
+    else:
+        compressed = zlib.compress(body)
+    return bytes([PAYLOAD_VERSION, codec]) + compressed
+
+def decode_payload(blob: bytes) -> LazyPayload:
+    """Decompress the field map of an encoded payload; the fields themselves are unpacked on access."""
+    if len(blob) < 2 or blob[0] != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported analysis payload version: {blob[0] if blob else None}")
+    codec = blob[1]
+    if codec in (CODEC_MSGPACK_ZLIB, CODEC_MSGPACK_ZSTD) and not MSGPACK_AVAILABLE:
+        raise ValueError("msgpack is required to read this analysis payload")
+    if codec == CODEC_MSGPACK_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstandard is required to read this analysis payload")
+        body = zstandard.ZstdDecompressor().decompress(blob[2:])
+    elif codec in (CODEC_MSGPACK_ZLIB, CODEC_JSON_ZLIB):
+        body = zlib.decompress(blob[2:])
+    else:
+        raise ValueError(f"Unknown analysis payload codec: {codec}")
+    if codec == CODEC_JSON_ZLIB:
+        fields = json.loads(body)
+    else:
+        fields = msgpack.unpackb(body, raw=False)
+    return LazyPayload(fields, codec)
+
+def encode_payload_text(data: Dict[str, Any], compression: str = "zlib") -> str:
+    """The encoded payload as base64 text, for text and JSON columns."""
+    return TEXT_PREFIX + base64.b64encode(encode_payload(data, compression)).decode('ascii')
+
+def decode_stored_payload(value: Any) -> Any:
+    """Decode an analysis_data value as stored: encoded bytes, prefixed base64 text or plain JSON."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return decode_payload(bytes(value))
+    if isinstance(value, str):
+        if value.startswith(TEXT_PREFIX):
+            return decode_payload(base64.b64decode(value[len(TEXT_PREFIX):]))
+        return json.loads(value)
+    return value
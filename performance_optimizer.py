@@ -1,19 +1,348 @@
 import streamlit as st
 import hashlib
-from typing import List, Dict, Any, Optional
-from supabase import Client
-from nlp_utils import analyze_sections, readability_score, sentiment_scores, extract_keywords
-from error_handler import handle_nlp_errors, handle_database_errors
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Optional
+from config import config
+from nlp_utils import analyze_sections, readability_score, sentiment_scores, extract_keywords, comprehensive_analysis
+from error_handler import error_handler, handle_nlp_errors, handle_database_errors
+
+# Bump when analysis code changes its output; rubric changes are picked up automatically
+ANALYSIS_CACHE_VERSION = 1
+
+class CacheStats:
+    """Hit, miss and eviction counters for one cache layer."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.computes = 0
+        self.compute_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_compute(self, seconds: float):
+        with self._lock:
+            self.computes += 1
+            self.compute_seconds += seconds
+
+    def snapshot(self, entries: Optional[int], bytes_held: Optional[int]) -> Dict[str, Any]:
+        """Counters plus derived rates; time saved assumes each hit avoided an average compute."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_compute_ms = 1000 * self.compute_seconds / self.computes if self.computes else None
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': entries,
+                'bytes': bytes_held,
+                'avg_compute_ms': round(avg_compute_ms, 1) if avg_compute_ms is not None else None,
+                'time_saved_ms': round(self.hits * avg_compute_ms, 1) if avg_compute_ms is not None else None
+            }
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes, with a TTL.
+
+    Values are stored pickled, so their size is known exactly and callers
+    always get their own copy to mutate.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (payload, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key: str):
+        payload, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.count('misses')
+                return default
+            payload, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.stats.count('expirations')
+                self.stats.count('misses')
+                return default
+            self._entries.move_to_end(key)
+            self.stats.count('hits')
+        return pickle.loads(payload)
+
+    def _store(self, key: str, payload: bytes, expires_at: float):
+        # Caller holds the lock
+        if key in self._entries:
+            self._remove(key)
+        if len(payload) > self.max_bytes:
+            return  # would evict everything else and still not fit
+        self._entries[key] = (payload, expires_at)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.count('evictions')
+
+    def set(self, key: str, value: Any):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, payload, time.monotonic() + self.ttl)
+
+    def update(self, key: str, func: Callable[[Any], Any]) -> bool:
+        """Replace a live entry with func(value), keeping its expiry; absent entries are left absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                return False
+            payload = pickle.dumps(func(pickle.loads(entry[0])), protocol=pickle.HIGHEST_PROTOCOL)
+            self._store(key, payload, entry[1])
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def record_compute(self, seconds: float):
+        self.stats.record_compute(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, bytes_held = len(self._entries), self._bytes
+        return self.stats.snapshot(entries, bytes_held)
+
+class SQLiteCache:
+    """Cache in a SQLite file, shared by every process on the host and kept across restarts.
+
+    WAL mode lets readers proceed while another process writes; values are
+    zlib-compressed pickles. The file is bounded by `max_bytes`, dropping the
+    oldest entries first. Any SQLite error is logged and treated as a miss.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self.stats = CacheStats()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            error_handler.logger.warning(f"Shared cache read failed: {str(e)}")
+            self.stats.count('misses')
+            return default
+        if row is None:
+            self.stats.count('misses')
+            return default
+        try:
+            value = pickle.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            # Truncated, corrupt or pickled by an incompatible version: drop it and recompute
+            error_handler.logger.warning(f"Dropping unreadable shared cache entry: {str(e)}")
+            self.stats.count('misses')
+            self.delete(key)
+            return default
+        self.stats.count('hits')
+        return value
+
+    def delete(self, key: str):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            error_handler.logger.warning(f"Shared cache delete failed: {str(e)}")
+
+    def set(self, key: str, value: Any):
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now + self.ttl)
+                )
+                expired = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+                self.stats.count('expirations', max(expired, 0))
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+                if total > self.max_bytes:
+                    # Drop the oldest entries until the newest ones fit within the budget
+                    evicted = conn.execute("""
+                        DELETE FROM cache WHERE key IN (
+                            SELECT key FROM (
+                                SELECT key, SUM(size) OVER (ORDER BY created_at DESC) AS running
+                                FROM cache
+                            ) WHERE running > ?
+                        )
+                    """, (self.max_bytes,)).rowcount
+                    self.stats.count('evictions', max(evicted, 0))
+        except sqlite3.Error as e:
+            error_handler.logger.warning(f"Shared cache write failed: {str(e)}")
+
+    def clear(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            error_handler.logger.warning(f"Shared cache clear failed: {str(e)}")
+
+    def record_compute(self, seconds: float):
+        self.stats.record_compute(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entries and bytes are for the whole shared file; counters are this process's."""
+        try:
+            entries, bytes_held = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, bytes_held = None, None
+        return self.stats.snapshot(entries, bytes_held)
+
+class TieredCache:
+    """A per-process cache in front of a shared one; shared hits are promoted locally."""
+
+    def __init__(self, local: LRUCache, shared: SQLiteCache):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is None:
+                return default
+            self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def record_compute(self, seconds: float):
+        self.local.record_compute(seconds)
+        self.shared.record_compute(seconds)
+
+def analysis_version() -> str:
+    """Code version plus a digest of the scoring rubric, so either change invalidates old results."""
+    rubric = json.dumps([config.analysis.SECTION_CRITERIA, config.analysis.LEXICONS], sort_keys=True)
+    return f"v{ANALYSIS_CACHE_VERSION}-{hashlib.sha256(rubric.encode()).hexdigest()[:12]}"
+
+class AnalysisCache:
+    """Analysis results keyed by kind, content hash and analysis version."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, shared_path: Optional[str] = None,
+                 shared_max_bytes: int = 0):
+        self.store = LRUCache(max_entries, max_bytes, ttl)
+        if shared_path:
+            try:
+                self.store = TieredCache(self.store, SQLiteCache(shared_path, shared_max_bytes, ttl))
+            except (sqlite3.Error, OSError) as e:
+                error_handler.logger.warning(f"Shared analysis cache unavailable, using memory only: {str(e)}")
+        self.version = analysis_version()
+
+    def key(self, kind: str, text: str) -> str:
+        return f"{kind}:{self.version}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_or_compute(self, kind: str, text: str, compute: Callable[[], Any]) -> Any:
+        key = self.key(kind, text)
+        result = self.store.get(key)
+        if result is None:
+            start = time.perf_counter()
+            result = compute()
+            self.store.record_compute(time.perf_counter() - start)
+            self.store.set(key, result)
+        return result
 
 class PerformanceOptimizer:
     """Optimize performance with caching and other techniques."""
     
     def __init__(self):
-        pass
+        self.analysis_cache = AnalysisCache(
+            config.cache.NLP_ANALYSIS_MAX_ENTRIES,
+            config.cache.NLP_ANALYSIS_MAX_BYTES,
+            config.cache.NLP_ANALYSIS_TTL,
+            shared_path=config.cache.SHARED_CACHE_PATH if config.cache.SHARED_CACHE_ENABLED else None,
+            shared_max_bytes=config.cache.SHARED_CACHE_MAX_BYTES
+        )
+        self.user_analyses_cache = LRUCache(
+            config.cache.USER_ANALYSES_MAX_ENTRIES,
+            config.cache.USER_ANALYSES_MAX_BYTES,
+            config.cache.USER_ANALYSES_TTL
+        )
     
-    @st.cache_data(ttl=3600)  # Cache for 1 hour
-    def cached_nlp_analysis(self, text: str, text_hash: str):
+    def cached_nlp_analysis(self, text: str):
         """Cache NLP analysis results."""
+        return self.analysis_cache.get_or_compute('basic', text, lambda: self._nlp_analysis(text))
+    
+    def cached_comprehensive_analysis(self, text: str):
+        """Cache comprehensive_analysis results."""
+        return self.analysis_cache.get_or_compute('comprehensive', text, lambda: comprehensive_analysis(text))
+    
+    @staticmethod
+    def _nlp_analysis(text: str):
         score, strengths, weaknesses, tips, section_scores = analyze_sections(text)
         read_score = readability_score(text)
         sentiment = sentiment_scores(text)
@@ -30,40 +359,35 @@ class PerformanceOptimizer:
             'keywords': keywords
         }
     
-    @st.cache_data(ttl=300)  # Cache for 5 minutes
-    def cached_user_analyses(_self, user_id: str, *, _supabase_client: Client):
-        """Cache user analyses with proper handling of unhashable types."""
+    def cached_user_analyses(self, user_id: str, db_service):
+        """The first page of a user's history (list columns only), cached per user.
+
+        Kept current by write-through on save and delete.
+        """
         if not user_id:
             return []
-            
-        try:
-            result = _supabase_client.table('analyses').select('*').eq('user_id', user_id).order('date', desc=True).limit(10).execute()
-            
-            # Process the data to ensure it's in the right format
-            analyses = []
-            for item in result.data:
-                try:
-                    import json
-                    analysis = {
-                        'id': item.get('id'),
-                        'filename': item.get('filename', ''),
-                        'date': item.get('date', ''),
-                        'score': item.get('score', 0),
-                        'readability': item.get('readability', 0),
-                        'sentiment': json.loads(item.get('sentiment', '{}')) if isinstance(item.get('sentiment'), str) else item.get('sentiment', {}),
-                        'strengths': json.loads(item.get('strengths', '[]')) if isinstance(item.get('strengths'), str) else item.get('strengths', []),
-                        'weaknesses': json.loads(item.get('weaknesses', '[]')) if isinstance(item.get('weaknesses'), str) else item.get('weaknesses', []),
-                        'tips': json.loads(item.get('tips', '[]')) if isinstance(item.get('tips'), str) else item.get('tips', []),
-                        'keywords': json.loads(item.get('keywords', '[]')) if isinstance(item.get('keywords'), str) else item.get('keywords', [])
-                    }
-                    analyses.append(analysis)
-                except Exception:
-                    # Skip problematic items
-                    continue
-                    
-            return analyses
-        except Exception:
-            return []
+        analyses = self.user_analyses_cache.get(str(user_id))
+        if analyses is None:
+            start = time.perf_counter()
+            try:
+                analyses = db_service.list_user_analyses(user_id, config.ui.HISTORY_PAGE_SIZE)
+            except Exception:
+                return []  # failed fetches are not cached
+            self.user_analyses_cache.record_compute(time.perf_counter() - start)
+            self.user_analyses_cache.set(str(user_id), analyses)
+        return analyses
+    
+    def add_to_user_history(self, user_id: str, row: Dict[str, Any]):
+        """Prepend a newly saved row to the user's cached history, if it is cached."""
+        self.user_analyses_cache.update(str(user_id), lambda rows: [row] + rows)
+    
+    def remove_from_user_history(self, user_id: str, analysis_id: Any):
+        self.user_analyses_cache.update(
+            str(user_id), lambda rows: [r for r in rows if str(r.get('id')) != str(analysis_id)]
+        )
+    
+    def invalidate_user_history(self, user_id: str):
+        self.user_analyses_cache.delete(str(user_id))
 
 # Create a singleton instance
 perf_optimizer = PerformanceOptimizer()
@@ -71,12 +395,35 @@ perf_optimizer = PerformanceOptimizer()
 @handle_nlp_errors
 def analyze_text_cached(text: str):
     """Analyze text with caching."""
-    # Create a hash of the text to use as a cache key
-    text_hash = hashlib.md5(text.encode()).hexdigest()
-    return perf_optimizer.cached_nlp_analysis(text, text_hash)
+    return perf_optimizer.cached_nlp_analysis(text)
+
+def comprehensive_analysis_cached(text: str):
+    """comprehensive_analysis with caching."""
+    return perf_optimizer.cached_comprehensive_analysis(text)
 
 @handle_database_errors
-def get_user_analyses_cached(user_id: str, supabase_client: Client):
+def get_user_analyses_cached(user_id: str, db_service):
     """Get user analyses with caching."""
-    # Add underscore to make the parameter unhashable
-    return perf_optimizer.cached_user_analyses(user_id, _supabase_client=supabase_client)
\ No newline at end of file
+    return perf_optimizer.cached_user_analyses(user_id, db_service)
+
+def invalidate_user_history(user_id: str):
+    """Drop one user's cached history so the next read re-fetches it."""
+    perf_optimizer.invalidate_user_history(user_id)
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics for every cache layer, keyed by layer name."""
+    analysis_store = perf_optimizer.analysis_cache.store
+    layers = {}
+    if isinstance(analysis_store, TieredCache):
+        layers['analysis (memory)'] = analysis_store.local
+        layers['analysis (shared)'] = analysis_store.shared
+    else:
+        layers['analysis (memory)'] = analysis_store
+    layers['user analyses (memory)'] = perf_optimizer.user_analyses_cache
+    return {name: layer.get_stats() for name, layer in layers.items()}
+
+def render_cache_stats_panel():
+    """Debug panel with the cache statistics of this process."""
+    with st.expander("🧰 Cache statistics"):
+        st.dataframe(get_cache_stats(), use_container_width=True)
+        st.caption("Counters are per process; shared-cache entries and bytes cover the whole file.")
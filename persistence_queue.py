@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import heapq
+import queue
+import random
+import threading
+import streamlit as st
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Any
+from config import config
+from error_handler import error_handler
+
+class PersistenceQueue:
+    """Saves analyses in a background thread so results render before the database write.
+
+    Jobs go through a bounded queue; failed saves are retried with
+    exponential backoff and jitter, and after the last attempt written to a
+    dead-letter JSONL file. Every job carries a client-generated analysis id,
+    so a retry of a save that reached the database does not insert twice.
+    """
+
+    MAX_TRACKED = 1000  # job statuses kept for the UI to poll
+
+    def __init__(self, max_size: int, max_attempts: int, base_delay: float, max_delay: float, dead_letter_path: str):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = dead_letter_path
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_size)
+        self._retries = []  # heap of (due_time, sequence, job)
+        self._sequence = 0
+        self._statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+        self._worker.start()
+
+    def _set_status(self, analysis_id: str, **status):
+        with self._lock:
+            self._statuses[analysis_id] = {**self._statuses.get(analysis_id, {}), **status}
+            self._statuses.move_to_end(analysis_id)
+            while len(self._statuses) > self.MAX_TRACKED:
+                self._statuses.popitem(last=False)
+
+    def status(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """{'state': queued|saving|retrying|saved|failed, ...} for a submitted job."""
+        with self._lock:
+            status = self._statuses.get(analysis_id)
+            return dict(status) if status else None
+
+    def submit(self, db_service, user_id, analysis_id: str, analysis_data: Dict[str, Any]) -> bool:
+        """Queue a save; False if the queue is full and the caller should save synchronously."""
+        job = {'db_service': db_service, 'user_id': user_id, 'analysis_id': analysis_id,
+               'analysis_data': analysis_data, 'attempt': 0}
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            return False
+        self._set_status(analysis_id, state='queued')
+        return True
+
+    def _next_job(self) -> Dict[str, Any]:
+        while True:
+            with self._lock:
+                if self._retries and self._retries[0][0] <= time.monotonic():
+                    return heapq.heappop(self._retries)[2]
+                wait = self._retries[0][0] - time.monotonic() if self._retries else 1.0
+            try:
+                return self._queue.get(timeout=max(0.01, min(wait, 1.0)))
+            except queue.Empty:
+                continue
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            try:
+                self._process(job)
+            except Exception as e:
+                error_handler.logger.warning(f"Persistence worker error: {str(e)}")
+
+    def _process(self, job: Dict[str, Any]):
+        analysis_id = job['analysis_id']
+        self._set_status(analysis_id, state='saving', attempt=job['attempt'] + 1)
+        error = None
+        try:
+            # Raising keeps the backend's own error for the status and the dead letter
+            row = job['db_service'].save_analysis(job['user_id'], job['analysis_data'], client_id=analysis_id,
+                                                  retry=job['attempt'] > 0, raise_errors=True)
+        except Exception as e:
+            row, error = None, f"{type(e).__name__}: {e}"
+
+        if row:
+            saved_id = row.get('id') if isinstance(row, dict) else None
+            self._after_save(saved_id, job)
+            self._set_status(analysis_id, state='saved', saved_id=saved_id, error=None)
+            return
+
+        job['attempt'] += 1
+        if job['attempt'] >= self.max_attempts:
+            self._dead_letter(job, error or "save returned no row")
+            self._set_status(analysis_id, state='failed', error=error)
+            return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (job['attempt'] - 1)) * random.uniform(0.5, 1.0)
+        self._set_status(analysis_id, state='retrying', error=error, retry_in=round(delay, 1))
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._retries, (time.monotonic() + delay, self._sequence, job))
+
+    @staticmethod
+    def _after_save(saved_id, job: Dict[str, Any]):
+        from corpus_benchmark import record_for_benchmark
+        from similarity_index import index_analysis
+        analysis_data = job['analysis_data']
+        if analysis_data.get('full_analysis'):
+            record_for_benchmark(analysis_data['full_analysis'])
+        index_analysis(saved_id, job['user_id'], analysis_data)
+
+    def _dead_letter(self, job: Dict[str, Any], error: str):
+        entry = {
+            'analysis_id': job['analysis_id'],
+            'user_id': job['user_id'],
+            'attempts': job['attempt'],
+            'error': error,
+            'failed_at': datetime.now().isoformat(),
+            'analysis_data': job['analysis_data']
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(self.dead_letter_path))
+            os.makedirs(directory, exist_ok=True)
+            with self._lock, open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(entry, default=str) + '\n')
+        except OSError as e:
+            error_handler.logger.warning(f"Could not write dead letter for analysis {job['analysis_id']}: {str(e)}")
+        error_handler.logger.warning(f"Analysis {job['analysis_id']} not saved after {job['attempt']} attempts: {error}")
+
+@st.cache_resource(show_spinner=False)
+def get_persistence_queue() -> PersistenceQueue:
+    """Process-wide persistence queue and its worker thread."""
+    settings = config.persistence
+    return PersistenceQueue(
+        max_size=settings.QUEUE_MAX_SIZE,
+        max_attempts=settings.MAX_SAVE_ATTEMPTS,
+        base_delay=settings.RETRY_BASE_DELAY,
+        max_delay=settings.RETRY_MAX_DELAY,
+        dead_letter_path=settings.DEAD_LETTER_PATH
+    )
@@ -0,0 +1,227 @@
+import re
+import numpy as np
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any
+
+MAGNITUDES = {
+    'k': 1e3, 'thousand': 1e3,
+    'm': 1e6, 'mm': 1e6, 'mn': 1e6, 'million': 1e6,
+    'b': 1e9, 'bn': 1e9, 'billion': 1e9,
+    't': 1e12, 'trillion': 1e12
+}
+CURRENCIES = {'$': 'USD', 'usd': 'USD', '€': 'EUR', 'eur': 'EUR', '£': 'GBP', 'gbp': 'GBP'}
+
+CATEGORY_KEYWORDS = {
+    'revenue': ['revenue', 'revenues', 'sales', 'income', 'earnings', 'arr', 'mrr', 'gmv', 'bookings'],
+    'users': ['users', 'customers', 'subscribers', 'clients', 'downloads', 'signups', 'members'],
+    'growth': ['growth', 'increase', 'grew', 'increased', 'yoy', 'mom', 'cagr', 'growing'],
+    'funding': ['funding', 'raising', 'raised', 'raise', 'investment', 'round', 'seed', 'series', 'valuation'],
+    'market': ['market', 'tam', 'sam', 'som', 'industry']
+}
+CATEGORY_BY_KEYWORD = {word: category for category, words in CATEGORY_KEYWORDS.items() for word in words}
+
+UNITS = ['count', 'percent', 'USD', 'EUR', 'GBP']
+CATEGORIES = ['other'] + list(CATEGORY_KEYWORDS)
+
+# One scanner for the whole document: each match is a quantity, a word or a sentence boundary.
+# A number glued to a letter or digit ("Q3", "H1", "FY24") is part of a label, not a quantity.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<quantity>
+        (?P<symbol>[$€£])?\s?
+        (?<![a-z\d])
+        (?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)
+        (?:\s?(?P<magnitude>thousand|million|billion|trillion|mm|mn|bn|[kmbt])\b)?
+        (?:\s?(?P<percent>%|percent\b))?
+        (?:\s?(?P<code>usd|eur|gbp)\b)?
+    )
+    |(?P<word>[a-z]+)
+    |(?P<boundary>[.!?;\n])
+""", re.IGNORECASE | re.VERBOSE)
+
+YEAR_PATTERN = re.compile(r"(?:19|20)\d{2}")
+
+@dataclass
+class Quantity:
+    """A normalized numeric claim found in a document."""
+    value: float
+    unit: str
+    category: str
+    start: int
+    end: int
+    text: str
+
+def _to_quantity(match: re.Match) -> Optional[Quantity]:
+    number, symbol = match.group('number'), match.group('symbol')
+    magnitude, percent, code = match.group('magnitude'), match.group('percent'), match.group('code')
+    if not (symbol or magnitude or percent or code) and YEAR_PATTERN.fullmatch(number):
+        return None  # a bare year, not a quantity
+
+    value = float(number.replace(',', ''))
+    if magnitude:
+        value *= MAGNITUDES[magnitude.lower()]
+    if percent:
+        unit = 'percent'
+    elif symbol or code:
+        unit = CURRENCIES[(symbol or code).lower()]
+    else:
+        unit = 'count'
+    # Offsets cover the stripped text, not whitespace taken by the optional gaps
+    raw = match.group('quantity')
+    start = match.start('quantity') + len(raw) - len(raw.lstrip())
+    text = raw.strip()
+    return Quantity(value, unit, 'other', start, start + len(text), text)
+
+def parse_quantities(text: str, lookahead: int = 4, lookbehind: int = 6) -> List[Quantity]:
+    """Parse every quantity in one scan of the text.
+
+    A quantity takes the category of the first category keyword within
+    `lookahead` words after it ("$2.5m revenue"), else the nearest one within
+    `lookbehind` words before it ("revenue of $2.5m"), else 'other'. Context
+    never crosses a sentence boundary.
+    """
+    quantities: List[Quantity] = []
+    pending = []  # [quantity, category seen before it, words seen since]
+    recent = deque(maxlen=lookbehind)
+
+    def settle(entry, category=None):
+        entry[0].category = category or entry[1] or 'other'
+        quantities.append(entry[0])
+
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group('boundary'):
+            for entry in pending:
+                settle(entry)
+            pending = []
+            recent.clear()
+            continue
+
+        word = match.group('word')
+        if word is None:
+            quantity = _to_quantity(match)
+            if quantity is not None:
+                behind = next((CATEGORY_BY_KEYWORD[w] for w in reversed(recent) if w in CATEGORY_BY_KEYWORD), None)
+                pending.append([quantity, behind, 0])
+            continue
+
+        word = word.lower()
+        category = CATEGORY_BY_KEYWORD.get(word)
+        still_pending = []
+        for entry in pending:
+            entry[2] += 1
+            if category:
+                settle(entry, category)
+            elif entry[2] >= lookahead:
+                settle(entry)
+            else:
+                still_pending.append(entry)
+        pending = still_pending
+        recent.append(word)
+
+    for entry in pending:
+        settle(entry)
+    quantities.sort(key=lambda quantity: quantity.start)
+    return quantities
+
+class QuantityIndex:
+    """Column-oriented arrays of a document's quantities."""
+
+    def __init__(self, values, units, categories, starts, ends):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.units = np.asarray(units, dtype=np.int8)
+        self.categories = np.asarray(categories, dtype=np.int8)
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_quantities(cls, quantities: List[Quantity]) -> "QuantityIndex":
+        return cls(
+            [q.value for q in quantities],
+            [UNITS.index(q.unit) for q in quantities],
+            [CATEGORIES.index(q.category) for q in quantities],
+            [q.start for q in quantities],
+            [q.end for q in quantities]
+        )
+
+    @classmethod
+    def from_text(cls, text: str) -> "QuantityIndex":
+        return cls.from_quantities(parse_quantities(text))
+
+    def mask(self, category: Optional[str] = None, unit: Optional[str] = None) -> np.ndarray:
+        selected = np.ones(len(self), dtype=bool)
+        if category is not None:
+            selected &= self.categories == CATEGORIES.index(category)
+        if unit is not None:
+            selected &= self.units == UNITS.index(unit)
+        return selected
+
+    def to_dict(self) -> Dict[str, List]:
+        """JSON-safe column lists, for storing with an analysis."""
+        return {
+            'values': self.values.tolist(),
+            'units': self.units.tolist(),
+            'categories': self.categories.tolist(),
+            'starts': self.starts.tolist(),
+            'ends': self.ends.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List]) -> "QuantityIndex":
+        return cls(data['values'], data['units'], data['categories'], data['starts'], data['ends'])
+
+class QuantityCorpus(QuantityIndex):
+    """Quantities of many documents concatenated, with the owning document per row."""
+
+    def __init__(self, values, units, categories, starts, ends, documents, n_documents):
+        super().__init__(values, units, categories, starts, ends)
+        self.documents = np.asarray(documents, dtype=np.int32)
+        self.n_documents = n_documents
+
+    @classmethod
+    def from_indexes(cls, indexes: List[QuantityIndex]) -> "QuantityCorpus":
+        def column(name, dtype):
+            arrays = [getattr(index, name) for index in indexes]
+            return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+        documents = np.repeat(np.arange(len(indexes)), [len(index) for index in indexes])
+        return cls(column('values', np.float64), column('units', np.int8), column('categories', np.int8),
+                   column('starts', np.int32), column('ends', np.int32), documents, len(indexes))
+
+    @classmethod
+    def from_analyses(cls, analyses: List[Dict[str, Any]]) -> "QuantityCorpus":
+        """Corpus of comprehensive_analysis results; ones without quantities count as empty documents."""
+        empty = {'values': [], 'units': [], 'categories': [], 'starts': [], 'ends': []}
+        return cls.from_indexes([QuantityIndex.from_dict(a.get('quantities') or empty) for a in analyses])
+
+    def per_document(self, category: str, unit: str, reducer=np.maximum) -> np.ndarray:
+        """One value per document (NaN where absent), reduced with a ufunc such as np.maximum."""
+        selected = self.mask(category, unit)
+        result = np.full(self.n_documents, np.nan)
+        documents, values = self.documents[selected], self.values[selected]
+        if len(values):
+            initial = -np.inf if reducer is np.maximum else np.inf if reducer is np.minimum else 0.0
+            reduced = np.full(self.n_documents, initial)
+            reducer.at(reduced, documents, values)
+            present = np.zeros(self.n_documents, dtype=bool)
+            present[documents] = True
+            result[present] = reduced[present]
+        return result
+
+    def median(self, category: str, unit: str, document_mask: Optional[np.ndarray] = None,
+               reducer=np.maximum) -> Optional[float]:
+        """Median across documents of each document's reduced claim.
+
+        e.g. the median ARR claimed by seed decks:
+        corpus.median('revenue', 'USD', document_mask=is_seed)
+        """
+        claims = self.per_document(category, unit, reducer)
+        if document_mask is not None:
+            claims = claims[document_mask]
+        claims = claims[~np.isnan(claims)]
+        return float(np.median(claims)) if len(claims) else None
+
+def quantity_records(quantities: List[Quantity]) -> List[Dict[str, Any]]:
+    return [asdict(quantity) for quantity in quantities]
@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config import config
+from error_handler import error_handler
+
+# (download name, data path) for every NLTK package the app uses
+NLTK_PACKAGES = [
+    ('stopwords', 'corpora/stopwords'),
+    ('wordnet', 'corpora/wordnet'),
+    ('omw-1.4', 'corpora/omw-1.4'),
+    ('vader_lexicon', 'sentiment/vader_lexicon'),
+    ('punkt', 'tokenizers/punkt'),
+    ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger')
+]
+
+WARMUP_TEXT = (
+    "The problem: founders waste weeks on pitch decks. Our solution is a platform that "
+    "scores decks instantly. The market is $12bn and growing 20% a year. We have 1,200 "
+    "customers and $500k ARR. Our team has built two startups. We are raising $2M."
+)
+
+class ResourceRegistry:
+    """Process-wide owner of expensive singletons (NLTK data, analyzers, the model).
+
+    Each resource is built once, on first use or by the background warm-up,
+    behind its own lock so concurrent sessions never build it twice.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._resources: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_lock = threading.Lock()
+        self.load_ms: Dict[str, float] = {}
+        self.ready = threading.Event()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        if name in self._resources:
+            return self._resources[name]
+        with self._locks[name]:
+            if name not in self._resources:
+                start = time.perf_counter()
+                self._resources[name] = self._factories[name]()
+                self.load_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+        return self._resources[name]
+
+    def warm(self, names: Optional[List[str]] = None):
+        """Build the given resources (all by default), logging rather than raising on failure."""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                error_handler.logger.warning(f"Failed to warm resource '{name}': {str(e)}")
+        self.ready.set()
+        error_handler.logger.info(f"Resources warmed: {self.load_ms}")
+
+    def start_warmup(self):
+        """Warm every resource in a daemon thread; later calls are no-ops."""
+        with self._warmup_lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self.warm, name="resource-warmup", daemon=True)
+                self._warmup_thread.start()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready.is_set()
+
+def _ensure_nltk_data():
+    """Download missing NLTK packages; installed ones are found locally without network access."""
+    import nltk
+    for package, path in NLTK_PACKAGES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            try:
+                nltk.data.find(path + '.zip')
+            except LookupError:
+                nltk.download(package, quiet=True)
+    return True
+
+def _stopwords():
+    from nltk.corpus import stopwords
+    registry.get('nltk_data')
+    return frozenset(stopwords.words('english'))
+
+def _lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    registry.get('nltk_data')
+    lemmatizer = WordNetLemmatizer()
+    lemmatizer.lemmatize('warming')  # WordNet itself loads lazily on first use
+    return lemmatizer
+
+def _sentiment_analyzer():
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    registry.get('nltk_data')
+    return SentimentIntensityAnalyzer()
+
+def _sentence_tokenizer():
+    import nltk
+    registry.get('nltk_data')
+    nltk.sent_tokenize(WARMUP_TEXT)  # loads and caches the Punkt model
+    return nltk.sent_tokenize
+
+def _quality_model():
+    from model_service import load_quality_model
+    return load_quality_model() if config.model.ENABLE_ML_SCORING else None
+
+def _analysis_pipeline():
+    # One throwaway analysis pays for sklearn, textstat and regex first-use costs
+    from nlp_utils import comprehensive_analysis
+    from featurizer import featurize
+    analysis = comprehensive_analysis(WARMUP_TEXT)
+    featurize(WARMUP_TEXT, analysis['basic'])
+    return True
+
+registry = ResourceRegistry()
+registry.register('nltk_data', _ensure_nltk_data)
+registry.register('stopwords', _stopwords)
+registry.register('lemmatizer', _lemmatizer)
+registry.register('sentiment_analyzer', _sentiment_analyzer)
+registry.register('sentence_tokenizer', _sentence_tokenizer)
+registry.register('quality_model', _quality_model)
+registry.register('analysis_pipeline', _analysis_pipeline)
+
+def get_stopwords() -> frozenset:
+    return registry.get('stopwords')
+
+def get_lemmatizer():
+    return registry.get('lemmatizer')
+
+def get_sentiment_analyzer():
+    return registry.get('sentiment_analyzer')
+
+def sent_tokenize(text: str) -> List[str]:
+    return registry.get('sentence_tokenizer')(text)
+
+def start_resource_warmup():
+    registry.start_warmup()
+
+def resources_ready() -> bool:
+    return registry.is_ready
@@ -1,4 +1,5 @@
 import streamlit as st
+from config import config
 
 def extract_user_data_safely(current_user):
     """Safely extract user data with fallback values."""
@@ -32,7 +33,7 @@ def extract_user_data_safely(current_user):
             'initial': 'U'
         }
 
-def render_figma_sidebar(current_user=None, analyses=None):
+def render_figma_sidebar(current_user=None, analyses=None, stats=None):
     """Render an improved sidebar with user info and better signout button."""
     # Get theme and user data
     dark_mode = st.session_state.get('dark_mode', False)
@@ -390,9 +391,17 @@ def render_figma_sidebar(current_user=None, analyses=None):
             </div>
             <div class="stats-grid">
                 <div class="stat-item">
-                    <div class="stat-number">{len(analyses) if analyses else 0}</div>
+                    <div class="stat-number">{stats['total_analyses'] if stats else len(analyses or [])}</div>
                     <div class="stat-label">Analyses</div>
                 </div>
+                <div class="stat-item">
+                    <div class="stat-number">{f"{stats['avg_score']:.0f}" if stats and stats['total_analyses'] else '–'}</div>
+                    <div class="stat-label">Avg Score</div>
+                </div>
+                <div class="stat-item">
+                    <div class="stat-number">{f"{stats['best_score']:.0f}" if stats and stats['total_analyses'] else '–'}</div>
+                    <div class="stat-label">Best</div>
+                </div>
                 <div class="stat-item">
                     <div class="stat-number">Pro</div>
                     <div class="stat-label">Plan</div>
@@ -408,15 +417,26 @@ def render_figma_sidebar(current_user=None, analyses=None):
         <div class="recent-analyses">
     """, unsafe_allow_html=True)
     
+    if isinstance(current_user, dict):
+        user_id = current_user.get('id') or current_user.get('user_id')
+    else:
+        user_id = getattr(current_user, 'id', None) or getattr(current_user, 'user_id', None)
+    
     # Add refresh button
     if st.sidebar.button("Refresh", help="Refresh analyses", key="refresh_analyses"):
-        if 'analyses' in st.session_state:
-            del st.session_state.analyses
+        from performance_optimizer import invalidate_user_history
+        if user_id:
+            invalidate_user_history(user_id)
+        st.session_state.history_more = []
+        st.session_state.history_exhausted = False
         st.rerun()
     
+    # First page from the history cache, then any pages loaded with "Load more"
+    rows = list(analyses or []) + st.session_state.get('history_more', [])
+    
     # Display analyses or empty state
-    if analyses and len(analyses) > 0:
-        for analysis in analyses[:5]:  # Show only last 5
+    if rows:
+        for analysis in rows:
             # Get filename and truncate if too long
             filename = analysis.get('filename', 'Unknown File')
             if len(filename) > 20:
@@ -449,6 +469,9 @@ def render_figma_sidebar(current_user=None, analyses=None):
                 elif analysis.get('overall_score') is not None:
                     score_val = analysis.get('overall_score')
                     score = int(score_val) if isinstance(score_val, (int, float)) else score_val
+                elif analysis.get('score') is not None:
+                    score_val = analysis.get('score')
+                    score = int(score_val) if isinstance(score_val, (int, float)) else score_val
             except:
                 score = "N/A"
             
@@ -473,6 +496,21 @@ def render_figma_sidebar(current_user=None, analyses=None):
                 </div>
             </div>
             """, unsafe_allow_html=True)
+            if analysis.get('id') is not None and st.sidebar.button("Open", key=f"open_analysis_{analysis['id']}"):
+                st.session_state.open_analysis_id = analysis['id']
+                st.rerun()
+        
+        # Keyset pagination: the next page starts after the last row shown
+        if user_id and not st.session_state.get('history_exhausted') and \
+                len(rows) >= config.ui.HISTORY_PAGE_SIZE and \
+                st.sidebar.button("Load more", key="load_more_analyses"):
+            try:
+                page = st.session_state.db_service.list_user_analyses(user_id, config.ui.HISTORY_PAGE_SIZE, after=rows[-1])
+            except Exception:
+                page = []
+            st.session_state.history_more = st.session_state.get('history_more', []) + page
+            st.session_state.history_exhausted = len(page) < config.ui.HISTORY_PAGE_SIZE
+            st.rerun()
     else:
         st.sidebar.markdown("""
         <div class="empty-state">
@@ -0,0 +1,318 @@
+import os
+import json
+import zlib
+import struct
+import threading
+import numpy as np
+import streamlit as st
+from collections import defaultdict
+from contextlib import contextmanager
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.random_projection import SparseRandomProjection
+from typing import Dict, List, Optional, Any
+from config import config
+from error_handler import error_handler
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+RECORD_ADD = 0
+RECORD_DELETE = 1
+RECORD_HEADER = struct.Struct('<BII')  # record kind, payload length, CRC-32 of the payload
+ROW_NUMBER = struct.Struct('<Q')  # row of an added document in the vector file
+
+class SimilarityIndex:
+    """Approximate nearest-neighbour index over saved analyses.
+
+    Documents are the featurizer's preprocessed tokens, hashed into sublinear
+    term frequencies and reduced to `dim` dimensions with a seeded sparse
+    random projection. Both steps are stateless, so inserting a document never
+    changes the vectors of documents already indexed. Candidates come from
+    random-hyperplane LSH tables and are re-ranked by exact cosine similarity.
+
+    On disk, `vectors.f32` holds raw float32 rows and is memory-mapped, so
+    loading never reads the vectors into memory. `rows.log` is an append-only
+    log of checksummed records: an added document (its row in the vector file,
+    then meta JSON) or a deletion tombstone. Writers append under an exclusive
+    file lock. Readers apply records in order and stop at a torn or
+    half-written one; the next writer truncates a torn tail left by a crash.
+    """
+
+    N_FEATURES = 2 ** 18
+
+    def __init__(self, directory: str, dim: int = 128, n_tables: int = 8, n_bits: int = 12, seed: int = 42):
+        self.directory = directory
+        self.dim = dim
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self._lock = threading.Lock()
+
+        self.hasher = HashingVectorizer(n_features=self.N_FEATURES, alternate_sign=False, norm=None)
+        self.projection = SparseRandomProjection(n_components=dim, dense_output=True, random_state=seed)
+        self.projection.fit(csr_matrix((1, self.N_FEATURES)))  # only the input width is used
+        self.planes = np.random.RandomState(seed + 1).standard_normal((dim, n_tables * n_bits)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.int64)
+
+        self._vectors = np.empty((0, dim), dtype=np.float32)  # memmap of the vector file
+        self._vector_rows = np.empty(0, dtype=np.int64)  # vector file row of each document
+        self._count = 0
+        self._meta: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._user_rows: Dict[str, List[int]] = defaultdict(list)
+        self._buckets = [defaultdict(list) for _ in range(n_tables)]
+        self._deleted = set()
+        self._offset = 0  # bytes of the log applied so far
+        with self._lock:
+            self._sync()
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, 'rows.log')
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, 'vectors.f32')
+
+    def __len__(self) -> int:
+        return self._count - len(self._deleted)
+
+    def __contains__(self, analysis_id: Any) -> bool:
+        with self._lock:
+            self._sync()
+            return str(analysis_id) in self._positions
+
+    def embed(self, token_strings: List[str]) -> np.ndarray:
+        """Unit-length reduced vectors for preprocessed token strings."""
+        counts = self.hasher.transform(token_strings)
+        counts.data = np.log1p(counts.data)
+        vectors = np.asarray(self.projection.transform(counts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self.planes > 0).reshape(len(vectors), self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._bit_weights
+
+    def _map_vectors(self, rows_needed: int):
+        """Re-map the vector file once it holds rows this mapping does not cover."""
+        if rows_needed <= len(self._vectors):
+            return
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+
+    def _apply(self, kind: int, payload: bytes):
+        if kind == RECORD_ADD:
+            meta = json.loads(payload[ROW_NUMBER.size:])
+            if str(meta['id']) in self._positions:
+                return
+            # Grow the row map geometrically
+            if self._count == len(self._vector_rows):
+                self._vector_rows = np.concatenate([self._vector_rows, np.empty(max(64, self._count), dtype=np.int64)])
+            self._vector_rows[self._count] = ROW_NUMBER.unpack_from(payload)[0]
+            self._meta.append(meta)
+            self._positions[str(meta['id'])] = self._count
+            self._user_rows[str(meta['user_id'])].append(self._count)
+            self._count += 1
+        elif kind == RECORD_DELETE:
+            row = self._positions.pop(str(json.loads(payload)['id']), None)
+            if row is not None:
+                self._deleted.add(row)
+                self._user_rows[str(self._meta[row]['user_id'])].remove(row)
+
+    def _sync(self):
+        """Apply records appended since the log was last read, by this or another process."""
+        try:
+            size = os.path.getsize(self._log_path)
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with open(self._log_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        first_new = self._count
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            kind, length, checksum = RECORD_HEADER.unpack_from(data, position)
+            start = position + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break  # torn, or still being written; read again from here next time
+            self._apply(kind, payload)
+            position = start + length
+        self._offset += position
+
+        # Bucket the new documents in one pass over their mapped vectors
+        if self._count > first_new:
+            new_rows = self._vector_rows[first_new:self._count]
+            self._map_vectors(int(new_rows.max()) + 1)
+            codes = self._codes(np.asarray(self._vectors[new_rows]))
+            for row, row_codes in enumerate(codes, start=first_new):
+                for table, code in enumerate(row_codes):
+                    self._buckets[table][int(code)].append(row)
+
+    @contextmanager
+    def _writing(self):
+        """Hold the writer lock with this process caught up and any torn log tail removed."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._log_path + '.lock', 'w') as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._sync()
+            if os.path.exists(self._log_path) and os.path.getsize(self._log_path) > self._offset:
+                os.truncate(self._log_path, self._offset)  # a crashed writer's torn record
+            yield
+            self._sync()
+
+    def _append_record(self, kind: int, payload: bytes):
+        record = RECORD_HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload
+        with open(self._log_path, 'ab') as f:
+            f.write(record)
+
+    def _append_vector(self, vector: np.ndarray) -> int:
+        """Write one vector to the end of the vector file and return its row."""
+        row_bytes = 4 * self.dim
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        row = size // row_bytes
+        if size % row_bytes:
+            os.truncate(self._vectors_path, row * row_bytes)  # a crashed writer's partial row
+        with open(self._vectors_path, 'ab') as f:
+            f.write(np.asarray(vector, dtype=np.float32).tobytes())
+        return row
+
+    def add(self, analysis_id: Any, user_id: Any, filename: str, tokens: str, date: Optional[str] = None):
+        """Insert one analysis; re-inserting a known id is a no-op."""
+        with self._lock:
+            self._sync()
+            if str(analysis_id) in self._positions:
+                return
+            vector = self.embed([tokens])[0]
+            meta = {'id': analysis_id, 'user_id': user_id, 'filename': filename, 'date': date}
+            with self._writing():
+                if str(analysis_id) in self._positions:
+                    return  # added by another process meanwhile
+                # The vector is complete on disk before any record points at it
+                row = self._append_vector(vector)
+                self._append_record(RECORD_ADD, ROW_NUMBER.pack(row) + json.dumps(meta, default=str).encode('utf-8'))
+
+    def remove(self, analysis_id: Any):
+        """Tombstone one analysis so it is no longer returned."""
+        with self._lock:
+            self._sync()
+            if str(analysis_id) not in self._positions:
+                return
+            with self._writing():
+                self._append_record(RECORD_DELETE, json.dumps({'id': analysis_id}, default=str).encode('utf-8'))
+
+    def query(self, tokens: str, k: int = 5, user_id: Any = None, exclude_id: Any = None) -> List[Dict[str, Any]]:
+        """Most similar analyses, optionally restricted to one user's history."""
+        with self._lock:
+            self._sync()
+            if len(self) == 0:
+                return []
+            vector = self.embed([tokens])[0]
+
+            if user_id is not None:
+                candidates = np.array(self._user_rows.get(str(user_id), []), dtype=np.int64)
+            else:
+                codes = self._codes(vector[None, :])[0]
+                candidates = np.unique(np.array(
+                    [row for table, code in enumerate(codes) for row in self._buckets[table].get(int(code), [])],
+                    dtype=np.int64
+                ))
+                if len(candidates) < k * 4:
+                    candidates = np.arange(self._count)  # too few LSH hits; scan everything
+                if self._deleted:
+                    candidates = candidates[~np.isin(candidates, list(self._deleted))]
+
+            if len(candidates) == 0:
+                return []
+            similarities = self._vectors[self._vector_rows[candidates]] @ vector
+            order = np.argsort(-similarities)
+
+            results = []
+            for position in order:
+                row = int(candidates[position])
+                meta = self._meta[row]
+                if exclude_id is not None and str(meta['id']) == str(exclude_id):
+                    continue
+                results.append({**meta, 'similarity': round(float(similarities[position]), 3)})
+                if len(results) == k:
+                    break
+            return results
+
+@st.cache_resource(show_spinner=False)
+def get_similarity_index() -> SimilarityIndex:
+    """Process-wide similarity index."""
+    return SimilarityIndex(
+        config.analysis.SIMILARITY_INDEX_DIR,
+        dim=config.analysis.SIMILARITY_DIM,
+        n_tables=config.analysis.SIMILARITY_TABLES,
+        n_bits=config.analysis.SIMILARITY_BITS
+    )
+
+def index_analysis(analysis_id: Any, user_id: Any, analysis_data: Dict[str, Any]):
+    """Add a saved analysis to the similarity index, logging rather than raising on failure."""
+    tokens = (analysis_data.get('feature_vector') or {}).get('tokens')
+    if not tokens or analysis_id is None:
+        return
+    try:
+        get_similarity_index().add(analysis_id, user_id, analysis_data.get('filename', 'Unknown'),
+                                   tokens, analysis_data.get('date'))
+    except Exception as e:
+        error_handler.logger.warning(f"Failed to index analysis {analysis_id}: {str(e)}")
+
+def unindex_analysis(analysis_id: Any):
+    """Drop a deleted analysis from the similarity index, logging rather than raising on failure."""
+    try:
+        get_similarity_index().remove(analysis_id)
+    except Exception as e:
+        error_handler.logger.warning(f"Failed to unindex analysis {analysis_id}: {str(e)}")
+
+_backfilled_users = set()
+_backfill_lock = threading.Lock()
+
+def backfill_user_index(user_id: Any, db_service, page_size: int = 100):
+    """Index a user's stored analyses in the background, once per process.
+
+    Covers analyses saved before the index existed or on another host. The
+    history is paged through its list rows, and only analyses not yet
+    indexed are fetched in full.
+    """
+    with _backfill_lock:
+        if user_id is None or db_service is None or str(user_id) in _backfilled_users:
+            return
+        _backfilled_users.add(str(user_id))
+
+    def run():
+        try:
+            index = get_similarity_index()
+            after = None
+            while True:
+                page = db_service.list_user_analyses(user_id, page_size, after=after)
+                for row in page:
+                    if row.get('id') is None or row['id'] in index:
+                        continue
+                    analysis = db_service.get_analysis(user_id, row['id'])
+                    data = analysis.get('analysis_data') if analysis else None
+                    if isinstance(data, dict):
+                        index_analysis(row['id'], user_id, {**data, 'date': row.get(db_service.date_column)})
+                if len(page) < page_size:
+                    break
+                after = page[-1]
+        except Exception as e:
+            error_handler.logger.warning(f"Similarity backfill for user {user_id} failed: {str(e)}")
+
+    threading.Thread(target=run, name="similarity-backfill", daemon=True).start()
+
+def find_similar_pitches(tokens: str, k: int = 5, user_id: Any = None, exclude_id: Any = None) -> List[Dict[str, Any]]:
+    """Similar saved pitches for display; empty on any index failure."""
+    try:
+        return get_similarity_index().query(tokens, k=k, user_id=user_id, exclude_id=exclude_id)
+    except Exception as e:
+        error_handler.logger.warning(f"Similarity query failed: {str(e)}")
+        return []
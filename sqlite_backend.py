@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+import streamlit as st
+from typing import List, Dict, Optional, Any
+from config import config
+from error_handler import handle_database_errors
+from performance_optimizer import perf_optimizer
+from storage_backend import StorageBackend, AnalysesSchema, KNOWN_COLUMNS, count_save
+from user_stats import UserStats
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    score REAL,
+    overall_score REAL,
+    readability_score REAL,
+    sentiment TEXT,
+    grade TEXT,
+    strengths TEXT,
+    weaknesses TEXT,
+    tips TEXT,
+    keywords TEXT,
+    analysis_data BLOB,
+    content_hash TEXT,
+    simhash TEXT,
+    client_id TEXT UNIQUE,
+    date TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_user_date ON analyses (user_id, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analyses_user_content_hash ON analyses (user_id, content_hash);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY,
+    total_analyses INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    best_score REAL NOT NULL,
+    last_date TEXT,
+    rolling_avg REAL
+);
+"""
+
+class SQLiteDatabaseService(StorageBackend):
+    """Analyses in a local SQLite file: an offline stand-in for Supabase and a single-node backend.
+
+    History pages are range scans of the (user_id, date, id) index. Per-user
+    stats live in their own table and are updated in the same transaction as
+    the save or delete that changes them.
+    """
+
+    BINARY_PAYLOADS = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema = AnalysesSchema(frozenset(KNOWN_COLUMNS), "date")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA_SQL)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; the persistence worker saves while requests read
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def schema(self) -> AnalysesSchema:
+        return self._schema
+
+    @staticmethod
+    def _load_stats(conn: sqlite3.Connection, user_id: str) -> Optional[UserStats]:
+        row = conn.execute("SELECT * FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        return UserStats.from_dict(dict(row)) if row else None
+
+    @staticmethod
+    def _store_stats(conn: sqlite3.Connection, user_id: str, stats: UserStats):
+        conn.execute(
+            "INSERT OR REPLACE INTO user_stats (user_id, total_analyses, score_sum, best_score, last_date, rolling_avg) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, stats.total_analyses, stats.score_sum, stats.best_score, stats.last_date, stats.rolling_avg)
+        )
+
+    def _rebuild_stats(self, conn: sqlite3.Connection, user_id: str) -> UserStats:
+        """Recompute a user's stats from their scores and dates, oldest first."""
+        stats = UserStats()
+        rows = conn.execute("SELECT overall_score, date FROM analyses WHERE user_id = ? ORDER BY date, id", (user_id,))
+        for score, date in rows:
+            stats.add(float(score or 0), date, config.analysis.STATS_EMA_ALPHA)
+        self._store_stats(conn, user_id, stats)
+        return stats
+
+    def save_analysis(self, user_id, analysis_data, client_id=None, retry=False, raise_errors=False):
+        """Insert an analysis and update the user's stats; return the saved row or False.
+
+        'client_id' is unique, so saving the same client id again returns the
+        row already stored instead of inserting a second one.
+        """
+        user_id = str(user_id)
+        try:
+            if retry and not client_id and analysis_data.get("content_hash"):
+                existing = self.find_analysis_by_content_hash(user_id, analysis_data["content_hash"])
+                if existing:
+                    return existing
+
+            payload = self._insert_payload(self.schema, user_id, analysis_data, client_id)
+            columns = list(payload)
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    f"INSERT INTO analyses ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    "ON CONFLICT (client_id) DO NOTHING",
+                    [payload[column] for column in columns]
+                )
+                if cursor.rowcount == 0:
+                    existing = conn.execute("SELECT * FROM analyses WHERE client_id = ?", (client_id,)).fetchone()
+                    count_save(failed=False)
+                    return self._parse_row(dict(existing))
+
+                stats = self._load_stats(conn, user_id)
+                if stats is None:
+                    self._rebuild_stats(conn, user_id)  # the rebuild already includes the new row
+                else:
+                    stats.add(float(payload["overall_score"] or 0), payload["date"], config.analysis.STATS_EMA_ALPHA)
+                    self._store_stats(conn, user_id, stats)
+
+            row = {"id": cursor.lastrowid, **payload, "analysis_data": analysis_data}
+            count_save(failed=False)
+            perf_optimizer.add_to_user_history(user_id, self.list_row(row))
+            return row
+        except sqlite3.Error as e:
+            print(f"Saving analysis failed: {e}")
+            count_save(failed=True)
+            if raise_errors:
+                raise
+            return False
+
+    def list_user_analyses(self, user_id, limit: int, after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """One page of a user's history, newest first, with list-view columns only."""
+        columns = ", ".join(self.list_columns())
+        if after is None:
+            rows = self._connect().execute(
+                f"SELECT {columns} FROM analyses WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT ?",
+                (str(user_id), limit)
+            )
+        else:
+            rows = self._connect().execute(
+                f"SELECT {columns} FROM analyses WHERE user_id = ? AND (date, id) < (?, ?) "
+                "ORDER BY date DESC, id DESC LIMIT ?",
+                (str(user_id), after["date"], after["id"], limit)
+            )
+        return [dict(row) for row in rows]
+
+    def get_analysis(self, user_id, analysis_id) -> Optional[Dict[str, Any]]:
+        """Fetch one full analysis row, e.g. when the user opens it from the history."""
+        row = self._connect().execute(
+            "SELECT * FROM analyses WHERE user_id = ? AND id = ?", (str(user_id), analysis_id)
+        ).fetchone()
+        return self._parse_row(dict(row)) if row else None
+
+    def find_analysis_by_content_hash(self, user_id, content_hash: str) -> Optional[Dict[str, Any]]:
+        """The list row of a saved analysis of identical content."""
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.list_columns())} FROM analyses WHERE user_id = ? AND content_hash = ? LIMIT 1",
+            (str(user_id), content_hash)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_user_analyses(self, user_id):
+        """Fetch all analyses for a user, newest first."""
+        rows = self._connect().execute(
+            "SELECT * FROM analyses WHERE user_id = ? ORDER BY date DESC, id DESC", (str(user_id),)
+        )
+        return [self._parse_row(dict(row)) for row in rows]
+
+    @handle_database_errors
+    def delete_analysis(self, user_id: str, analysis_id: str) -> bool:
+        """Delete a specific analysis and take it out of the user's stats."""
+        from similarity_index import unindex_analysis
+        user_id = str(user_id)
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT overall_score, date FROM analyses WHERE user_id = ? AND id = ?", (user_id, analysis_id)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM analyses WHERE user_id = ? AND id = ?", (user_id, analysis_id))
+            stats = self._load_stats(conn, user_id)
+            if stats is not None:
+                if stats.remove(float(row["overall_score"] or 0), row["date"]):
+                    self._store_stats(conn, user_id, stats)
+                else:
+                    self._rebuild_stats(conn, user_id)
+        perf_optimizer.remove_from_user_history(user_id, analysis_id)
+        unindex_analysis(analysis_id)
+        return True
+
+    @handle_database_errors
+    def get_user_stats(self, user_id: str) -> Dict[str, Any]:
+        """Get user statistics from the stats table, rebuilding them if missing."""
+        user_id = str(user_id)
+        conn = self._connect()
+        with conn:
+            stats = self._load_stats(conn, user_id) or self._rebuild_stats(conn, user_id)
+        return stats.to_dict()
+
+@st.cache_resource(show_spinner=False)
+def get_sqlite_service(path: str) -> SQLiteDatabaseService:
+    """Process-wide SQLite backend; its connections are per thread."""
+    return SQLiteDatabaseService(path)
@@ -0,0 +1,157 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+from config import config
+from error_handler import error_handler
+from payload_codec import encode_payload, encode_payload_text, decode_stored_payload
+
+# Every column save_analysis knows how to fill; the table may have any subset
+KNOWN_COLUMNS = [
+    "user_id", "filename", "score", "overall_score", "readability_score", "sentiment", "grade",
+    "strengths", "weaknesses", "tips", "keywords", "analysis_data", "content_hash", "simhash",
+    "client_id", "date", "created_at"
+]
+REQUIRED_COLUMNS = ["user_id", "filename"]
+RESULT_COLUMNS = ["analysis_data", "score", "overall_score"]
+# Columns list views need; the detected date column is added to these
+LIST_COLUMNS = ["id", "filename", "score", "overall_score", "content_hash", "simhash"]
+
+@dataclass(frozen=True)
+class AnalysesSchema:
+    """Which known columns the 'analyses' table has."""
+    columns: frozenset
+    date_column: Optional[str]
+    error: Optional[str] = None
+
+_save_metrics = {"saves": 0, "failed_saves": 0}
+_save_metrics_lock = threading.Lock()
+
+def count_save(failed: bool):
+    with _save_metrics_lock:
+        _save_metrics["failed_saves" if failed else "saves"] += 1
+
+def get_save_metrics() -> Dict[str, int]:
+    """Successful and failed analysis saves in this process."""
+    with _save_metrics_lock:
+        return dict(_save_metrics)
+
+class StorageBackend(ABC):
+    """Where analyses are saved, listed, fetched and deleted, and per-user stats kept.
+
+    Implementations write saves and deletes through to the per-user history
+    cache in `performance_optimizer`, so callers never invalidate it themselves.
+    """
+
+    # Store analysis_data as raw encoded bytes rather than base64 text
+    BINARY_PAYLOADS = False
+
+    @property
+    @abstractmethod
+    def schema(self) -> Optional[AnalysesSchema]:
+        """The 'analyses' columns available, or None if they are not known yet."""
+
+    @property
+    def date_column(self) -> str:
+        schema = self.schema
+        return schema.date_column if schema and schema.date_column else "date"
+
+    @abstractmethod
+    def save_analysis(self, user_id, analysis_data, client_id=None, retry=False, raise_errors=False):
+        """Save an analysis; return the saved row, or False. Saves sharing a `client_id` are stored once.
+
+        With `raise_errors`, a failed save raises its cause instead of returning False.
+        """
+
+    @abstractmethod
+    def list_user_analyses(self, user_id, limit: int, after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """One page of a user's history, newest first, keyed on (date, id) of the previous page's last row."""
+
+    @abstractmethod
+    def get_analysis(self, user_id, analysis_id) -> Optional[Dict[str, Any]]:
+        """One full analysis row."""
+
+    @abstractmethod
+    def find_analysis_by_content_hash(self, user_id, content_hash: str) -> Optional[Dict[str, Any]]:
+        """The list row of a saved analysis of identical content."""
+
+    @abstractmethod
+    def get_user_analyses(self, user_id) -> List[Dict[str, Any]]:
+        """Every full analysis row of a user, newest first."""
+
+    @abstractmethod
+    def delete_analysis(self, user_id: str, analysis_id: str) -> bool:
+        """Delete one analysis."""
+
+    @abstractmethod
+    def get_user_stats(self, user_id: str) -> Dict[str, Any]:
+        """A user's UserStats as a dict."""
+
+    @classmethod
+    def _insert_payload(cls, schema: AnalysesSchema, user_id, analysis_data, client_id=None) -> Dict[str, Any]:
+        """One insert row containing every known column the table actually has."""
+        now = datetime.now().isoformat()
+        values = {
+            "user_id": user_id,
+            "filename": analysis_data.get("filename", "Unknown"),
+            "score": analysis_data.get("overall_score", 0),
+            "overall_score": analysis_data.get("overall_score", 0),
+            "readability_score": analysis_data.get("readability_score", 0),
+            "sentiment": analysis_data.get("sentiment", "neutral"),
+            "grade": analysis_data.get("grade", "N/A"),
+            "strengths": json.dumps(analysis_data.get("strengths", [])),
+            "weaknesses": json.dumps(analysis_data.get("weaknesses", [])),
+            "tips": json.dumps(analysis_data.get("tips", [])),
+            "keywords": json.dumps(analysis_data.get("keywords", [])),
+            "analysis_data": cls._encode_analysis_data(analysis_data),
+            "content_hash": analysis_data.get("content_hash"),
+            "simhash": analysis_data.get("simhash"),
+            "client_id": client_id,
+            "date": now,
+            "created_at": now
+        }
+        return {column: value for column, value in values.items() if column in schema.columns}
+
+    @classmethod
+    def _encode_analysis_data(cls, analysis_data) -> Any:
+        compression = config.persistence.PAYLOAD_COMPRESSION
+        if cls.BINARY_PAYLOADS:
+            return encode_payload(analysis_data, compression)
+        return encode_payload_text(analysis_data, compression)
+
+    @staticmethod
+    def _parse_row(row):
+        """Decode the analysis_data of a fetched or inserted row in place; its fields unpack on access.
+
+        A payload that cannot be decoded becomes None, with the reason in 'analysis_error'.
+        """
+        if isinstance(row.get("analysis_data"), (str, bytes)):
+            try:
+                row["analysis_data"] = decode_stored_payload(row["analysis_data"])
+            except Exception as e:
+                error_handler.logger.error(f"Could not decode analysis {row.get('id')}: {str(e)}")
+                row["analysis_data"] = None
+                row["analysis_error"] = str(e)
+        return row
+
+    def list_columns(self) -> List[str]:
+        schema = self.schema
+        columns = LIST_COLUMNS + [self.date_column]
+        return [column for column in columns if column == "id" or schema is None or column in schema.columns]
+
+    def list_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Project a full row onto the list-view columns."""
+        return {column: row.get(column) for column in self.list_columns()}
+
+def create_storage_backend(sb=None) -> StorageBackend:
+    """The backend named by `config.persistence.STORAGE_BACKEND`: 'supabase' (needs `sb`) or 'sqlite'."""
+    backend = config.persistence.STORAGE_BACKEND
+    if backend == "sqlite":
+        from sqlite_backend import get_sqlite_service
+        return get_sqlite_service(config.persistence.SQLITE_DB_PATH)
+    if backend == "supabase":
+        from database_service import DatabaseService
+        return DatabaseService(sb)
+    raise ValueError(f"Unknown storage backend: {backend}")
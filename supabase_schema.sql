@@ -0,0 +1,31 @@
+-- Schema the Supabase backend expects beyond the original 'analyses' table.
+-- Safe to re-run: every statement is idempotent. Run it in the Supabase SQL
+-- editor (or psql) before deploying; sqlite_backend.py creates its own schema.
+
+-- Upload fingerprints (dedup.py) and idempotent saves (persistence_queue.py)
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS content_hash text;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS simhash text;
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS client_id text;
+
+-- save_analysis upserts on client_id; without this constraint it falls back
+-- to plain inserts and a retried save can be stored twice
+CREATE UNIQUE INDEX IF NOT EXISTS analyses_client_id ON analyses (client_id);
+
+-- Keyset-paged history (list_user_analyses) and duplicate lookups.
+-- Use created_at instead of date if that is the table's date column.
+CREATE INDEX IF NOT EXISTS analyses_user_date ON analyses (user_id, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analyses_user_content_hash ON analyses (user_id, content_hash);
+
+-- Per-user stats, maintained incrementally on every save and delete.
+-- 'version' is bumped by every write; updates are compare-and-swap on it.
+-- Without this table each process keeps its own short-lived stats in memory.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id text PRIMARY KEY,
+    total_analyses integer NOT NULL DEFAULT 0,
+    score_sum double precision NOT NULL DEFAULT 0,
+    best_score double precision NOT NULL DEFAULT 0,
+    last_date text,
+    rolling_avg double precision,
+    version bigint NOT NULL DEFAULT 0
+);
+ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 0;
@@ -0,0 +1,28 @@
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from featurizer import (stored_feature_record, feature_matrix, input_width, DENSE_FEATURE_NAMES,
+                        FEATURE_VERSION)
+from payload_codec import encode_payload, decode_payload
+
+def make_record(tokens, seed):
+    return {'version': FEATURE_VERSION, 'tokens': tokens,
+            'dense': [float(seed + i) for i in range(len(DENSE_FEATURE_NAMES))]}
+
+RECORDS = [make_record('strong team large market', 0), make_record('recurring revenue growth team', 1)]
+
+def stored(record):
+    # The record as read back from a saved analysis payload
+    return decode_payload(encode_payload({'feature_vector': stored_feature_record(record)}))['feature_vector']
+
+def test_matrix_from_stored_records_matches_fresh_records():
+    vectorizer = TfidfVectorizer().fit([record['tokens'] for record in RECORDS])
+    fresh = feature_matrix(RECORDS, vectorizer)
+    from_storage = feature_matrix([stored(record) for record in RECORDS], vectorizer)
+    assert from_storage.shape == (2, input_width(vectorizer))
+    assert (fresh != from_storage).nnz == 0
+
+def test_stored_record_of_another_version_is_refused():
+    vectorizer = TfidfVectorizer().fit([RECORDS[0]['tokens']])
+    record = {**stored(RECORDS[0]), 'version': FEATURE_VERSION - 1}
+    with pytest.raises(ValueError):
+        feature_matrix([record], vectorizer)
@@ -0,0 +1,74 @@
+import json
+import pickle
+import pytest
+from payload_codec import (LazyPayload, encode_payload, decode_payload, encode_payload_text,
+                           decode_stored_payload, PAYLOAD_VERSION, TEXT_PREFIX, ZSTD_AVAILABLE)
+
+PAYLOAD = {
+    'filename': 'deck.pdf',
+    'overall_score': 72,
+    'strengths': ['Clear problem statement', 'Strong team'],
+    'sentiment': {'compound': 0.41},
+    'ml_score': None,
+    'full_analysis': {'basic': {'score': 7.2, 'keywords': ['market', 'growth']}, 'overall_grade': 'B'}
+}
+
+def test_round_trip():
+    payload = decode_payload(encode_payload(PAYLOAD))
+    assert isinstance(payload, LazyPayload)
+    assert payload == PAYLOAD
+    assert not payload != PAYLOAD
+    assert payload.copy() == PAYLOAD and type(payload.copy()) is dict
+
+def test_header():
+    blob = encode_payload(PAYLOAD)
+    assert blob[0] == PAYLOAD_VERSION
+    with pytest.raises(ValueError):
+        decode_payload(bytes([PAYLOAD_VERSION + 1]) + blob[1:])
+    with pytest.raises(ValueError):
+        decode_payload(bytes([PAYLOAD_VERSION, 99]) + blob[2:])
+
+def test_fields_unpack_on_access():
+    payload = decode_payload(encode_payload(PAYLOAD))
+    assert payload['filename'] == 'deck.pdf'
+    assert 'Packed' in type(dict.__getitem__(payload, 'full_analysis')).__name__
+    assert payload.get('full_analysis') == PAYLOAD['full_analysis']
+    assert payload.get('missing', 'default') == 'default'
+
+def test_dict_operations_never_expose_packed_fields():
+    payload = decode_payload(encode_payload(PAYLOAD))
+    assert dict(payload) == PAYLOAD
+    assert {**payload} == PAYLOAD
+    assert repr(payload) == repr(PAYLOAD)
+    assert payload.setdefault('overall_score', 0) == 72
+    assert payload.pop('strengths') == PAYLOAD['strengths']
+    assert payload.popitem() == ('full_analysis', PAYLOAD['full_analysis'])
+    assert list(payload.values()) == [PAYLOAD[key] for key in payload]
+    assert json.loads(json.dumps(payload)) == {key: PAYLOAD[key] for key in payload}
+
+def test_payloads_compare_equal():
+    first, second = decode_payload(encode_payload(PAYLOAD)), decode_payload(encode_payload(PAYLOAD))
+    assert first == second and not first != second
+    assert first != {**PAYLOAD, 'overall_score': 10}
+
+def test_pickle_keeps_unread_fields():
+    payload = decode_payload(encode_payload(PAYLOAD))
+    payload['filename']
+    assert pickle.loads(pickle.dumps(payload)) == PAYLOAD
+
+def test_stored_forms():
+    text = encode_payload_text(PAYLOAD)
+    assert text.startswith(TEXT_PREFIX)
+    assert decode_stored_payload(text) == PAYLOAD
+    assert decode_stored_payload(encode_payload(PAYLOAD)) == PAYLOAD
+    assert decode_stored_payload(json.dumps(PAYLOAD)) == PAYLOAD  # rows saved before the encoding
+    assert decode_stored_payload(PAYLOAD) == PAYLOAD
+
+def test_compression_setting():
+    with pytest.raises(ValueError):
+        encode_payload(PAYLOAD, compression='lz4')
+    if ZSTD_AVAILABLE:
+        assert decode_payload(encode_payload(PAYLOAD, compression='zstd')) == PAYLOAD
+    else:
+        with pytest.raises(ValueError):
+            encode_payload(PAYLOAD, compression='zstd')
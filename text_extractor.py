@@ -4,17 +4,19 @@ import docx2txt
 import PyPDF2
 import pptx
 
-def extract_text_from_pdf(file):
-    text = ""
+def extract_pages_from_pdf(file):
+    pages = []
     try:
         reader = PyPDF2.PdfReader(file)
         for page in reader.pages:
             page_text = page.extract_text()
-            if page_text:
-                text += page_text + " "
+            pages.append(page_text.strip() if page_text else "")
     except Exception:
-        return ""
-    return text.strip()
+        return []
+    return pages
+
+def extract_text_from_pdf(file):
+    return " ".join(page for page in extract_pages_from_pdf(file) if page)
 
 def extract_text_from_docx(file):
     try:
@@ -27,21 +29,23 @@ def extract_text_from_docx(file):
     except Exception:
         return ""
 
-def extract_text_from_pptx(file):
-    text = ""
+def extract_pages_from_pptx(file):
+    pages = []
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as tmp:
             tmp.write(file.read())
             tmp_path = tmp.name
         prs = pptx.Presentation(tmp_path)
         for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text:
-                    text += shape.text + " "
+            texts = [shape.text for shape in slide.shapes if hasattr(shape, "text") and shape.text]
+            pages.append(" ".join(texts).strip())
         os.unlink(tmp_path)
     except Exception:
-        return ""
-    return text.strip()
+        return []
+    return pages
+
+def extract_text_from_pptx(file):
+    return " ".join(page for page in extract_pages_from_pptx(file) if page)
 
 def extract_text_from_txt(file):
     try:
@@ -63,4 +67,16 @@ def extract_text(file, filetype):
     elif filetype == ".txt":
         return extract_text_from_txt(file)
     else:
-        return "" 
\ No newline at end of file
+        return ""
+
+def extract_pages(file, filetype):
+    """
+    Text per page (PDF) or per slide (PPTX); DOCX and TXT come back as a single page.
+    Returns an empty list if extraction failed.
+    """
+    if filetype == ".pdf":
+        return extract_pages_from_pdf(file)
+    elif filetype == ".pptx":
+        return extract_pages_from_pptx(file)
+    text = extract_text(file, filetype)
+    return [text] if text else []
@@ -1,124 +1,442 @@
 # train_model.py
 
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import MaxAbsScaler
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, GroupShuffleSplit
 from sklearn.metrics import mean_squared_error
 import joblib
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import string
-import re
-from textblob import TextBlob  # May need to install: pip install textblob
-import textstat  # May need to install: pip install textstat
 import numpy as np
-from scipy.sparse import hstack
-
-# Ensure NLTK data is downloaded
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('wordnet', quiet=True)
-
-# Text Preprocessing Function (consistent with app)
-def preprocess_text(text):
-    text = text.lower()
-    text = re.sub(r'\d+', '', text) # Remove numbers
-    tokens = word_tokenize(text)
-    stop_words = set(stopwords.words('english'))
-    punctuations = string.punctuation
-    filtered_tokens = [word for word in tokens if word not in stop_words and word not in punctuations and word.isalpha()]
-    lemmatizer = WordNetLemmatizer()
-    lemmatized_tokens = [lemmatizer.lemmatize(token) for token in filtered_tokens]
-    return " ".join(lemmatized_tokens)
-
-# 1. Load the dataset
-try:
-    df = pd.read_csv('pitches_data.csv')
-    print("Dataset loaded successfully.")
-except FileNotFoundError:
-    print("Error: 'pitches_data.csv' not found. Please create it first.")
-    exit()
-
-# Ensure columns are correct
-if 'pitch_text' not in df.columns or 'score' not in df.columns:
-    print("Error: CSV must have 'pitch_text' and 'score' columns.")
-    exit()
-
-df.dropna(inplace=True) # Remove rows with missing data
-
-# 2. Preprocess the pitch text
-print("Preprocessing text data...")
-df['processed_text'] = df['pitch_text'].apply(preprocess_text)
-
-# --- Additional Features ---
-print("Extracting additional features (sentiment, readability, length, section presence)...")
-section_keywords = {
-    'problem': ['problem', 'pain point', 'challenge'],
-    'solution': ['solution', 'approach', 'how we solve'],
-    'market': ['market', 'TAM', 'SAM', 'SOM', 'opportunity'],
-    'team': ['team', 'founder', 'co-founder', 'background'],
-    'business_model': ['business model', 'revenue', 'pricing', 'monetization'],
-    'competition': ['competition', 'competitor', 'competitive'],
-    'traction': ['traction', 'growth', 'metrics', 'users'],
-    'ask': ['ask', 'funding', 'raise', 'investment']
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from compact_forest import CompactForest, verify_against
+from featurizer import featurize, feature_matrix, FEATURE_VERSION
+from dedup import MinHasher, find_duplicates
+from model_card import build_model_card, save_model_card, load_model_card, check_model_card
+from config import config
+
+VECTORIZER_PARAMS = {'max_features': 3000, 'min_df': 2, 'ngram_range': (1, 2)}
+
+# Search space for --tune
+RF_PARAM_DISTRIBUTIONS = {
+    'n_estimators': [100, 150, 250, 400],
+    'max_depth': [6, 8, 10, 14, 20, None],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': [1.0, 'sqrt', 0.3, 0.1]
 }
-def has_section(text, keywords):
-    text = text.lower()
-    return int(any(kw in text for kw in keywords))
-for section, keywords in section_keywords.items():
-    df[f'section_{section}'] = df['pitch_text'].apply(lambda x: has_section(x, keywords))
 
-def get_sentiment(text):
-    # pyright: ignore[reportAttributeAccessIssue]
-    return TextBlob(text).sentiment.polarity
+def _featurize_chunk(texts):
+    return [featurize(text) for text in texts]
+
+def _signature_chunk(texts):
+    return list(MinHasher().signatures(texts))
+
+def map_in_chunks(func, items, workers=None, chunk_size=1000, label="processed", pool=None):
+    """Apply `func` to chunks of items across a process pool, preserving input order.
+
+    Pass `pool` to reuse an existing executor instead of starting one per call.
+    """
+    items = list(items)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = [None] * len(chunks)
+    start = time.time()
+
+    def report(done_rows):
+        elapsed = time.time() - start
+        rate = done_rows / elapsed if elapsed > 0 else 0
+        print(f"  {label} {done_rows}/{len(items)} pitches ({rate:.0f}/s)")
+
+    if workers == 1 or len(chunks) <= 1:
+        done_rows = 0
+        for i, chunk in enumerate(chunks):
+            results[i] = func(chunk)
+            done_rows += len(chunk)
+            report(done_rows)
+    else:
+        own_pool = pool is None
+        if own_pool:
+            pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(func, chunk): i for i, chunk in enumerate(chunks)}
+            done_rows = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done_rows += len(chunks[i])
+                report(done_rows)
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+    return [result for chunk in results for result in chunk]
+
+def featurize_parallel(texts, workers=None, chunk_size=1000, pool=None):
+    """Featurize texts in chunks across a process pool, preserving input order."""
+    return map_in_chunks(_featurize_chunk, texts, workers, chunk_size, label="featurized", pool=pool)
+
+def find_near_duplicates(df, args):
+    """Cluster near-duplicate pitches with MinHash/LSH; return (keep_mask, cluster_ids)."""
+    print("Computing MinHash signatures for near-duplicate detection...")
+    signatures = np.array(map_in_chunks(_signature_chunk, df['pitch_text'], args.workers,
+                                        args.chunk_size, label="hashed"))
+    keep, clusters = find_duplicates(signatures, bands=args.lsh_bands, threshold=args.dedup_threshold)
+    print(f"Found {len(df) - int(keep.sum())} near-duplicates in {len(np.unique(clusters))} clusters")
+    return keep, clusters
+
+def _save_checkpoint(state, path):
+    tmp_path = path + '.tmp'
+    joblib.dump(state, tmp_path)
+    os.replace(tmp_path, path)  # atomic, so a kill mid-write leaves the last good checkpoint
+
+def train_streaming(args):
+    """Train out of core: stream the CSV in chunks into a hashing featurizer and SGD.
+
+    Memory stays bounded by the chunk size. A checkpoint is written every
+    `--checkpoint-every` chunks and a rerun with the same arguments resumes
+    after the last checkpointed chunk. Up to `--holdout-rows` rows from the
+    first chunks are never trained on; the model card is measured on them
+    and the model is published like the batch one.
+    """
+    # Stateless: no vocabulary is learned, so nothing grows with the dataset
+    vectorizer = HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False)
+
+    if os.path.exists(args.checkpoint):
+        state = joblib.load(args.checkpoint)
+        if state['feature_version'] != FEATURE_VERSION:
+            print(f"Error: checkpoint was built with feature version {state['feature_version']}. "
+                  f"Delete '{args.checkpoint}' to start over.")
+            exit()
+        if state.get('stream_chunk_rows') != args.stream_chunk_rows:
+            # Chunks are resumed by index, so a different chunk size would skip or repeat rows
+            print(f"Error: checkpoint was built with --stream-chunk-rows {state.get('stream_chunk_rows')}. "
+                  f"Resume with that value or delete '{args.checkpoint}' to start over.")
+            exit()
+        print(f"Resuming from checkpoint after {state['chunks_done']} chunks ({state['rows_seen']} rows)")
+    else:
+        state = {
+            'feature_version': FEATURE_VERSION,
+            'stream_chunk_rows': args.stream_chunk_rows,
+            'pipeline': Pipeline([
+                ('scale', MaxAbsScaler()),
+                ('model', SGDRegressor(penalty='l2', alpha=1e-5, random_state=42))
+            ]),
+            'chunks_done': 0,
+            'rows_seen': 0,
+            'rows_scored': 0,
+            'squared_error': 0.0,
+            'training_seconds': 0.0,
+            'holdout_texts': [],
+            'holdout_scores': []
+        }
+    state.setdefault('training_seconds', 0.0)
+    state.setdefault('holdout_texts', [])
+    state.setdefault('holdout_scores', [])
+    scaler = state['pipeline'].named_steps['scale']
+    regressor = state['pipeline'].named_steps['model']
+
+    try:
+        reader = pd.read_csv(args.data, chunksize=args.stream_chunk_rows, usecols=['pitch_text', 'score'])
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: could not read '{args.data}': {e}")
+        exit()
+
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers != 1 else None
+    try:
+        for chunk_index, chunk in enumerate(reader):
+            if chunk_index < state['chunks_done']:
+                continue  # already trained on before the checkpoint
+            chunk_start = time.time()
+            chunk = chunk.dropna()
+            # Hold out up to a fifth of each chunk until the card's test set is full
+            held_out = min(args.holdout_rows - len(state['holdout_texts']), len(chunk) // 5)
+            if held_out > 0:
+                state['holdout_texts'].extend(chunk['pitch_text'].iloc[:held_out].tolist())
+                state['holdout_scores'].extend(chunk['score'].iloc[:held_out].astype(float).tolist())
+                chunk = chunk.iloc[held_out:]
+            if chunk.empty:
+                state['chunks_done'] += 1
+                continue
+
+            records = featurize_parallel(chunk['pitch_text'], workers=args.workers, chunk_size=args.chunk_size,
+                                         pool=pool)
+            y = chunk['score'].to_numpy(dtype=float)
+            X = feature_matrix(records, vectorizer)
+            X = scaler.partial_fit(X).transform(X)
+
+            # Progressive validation: score each chunk before learning from it
+            if state['rows_seen'] > 0:
+                state['squared_error'] += float(((regressor.predict(X) - y) ** 2).sum())
+                state['rows_scored'] = state.get('rows_scored', 0) + len(chunk)
+            regressor.partial_fit(X, y)
+
+            state['chunks_done'] += 1
+            state['rows_seen'] += len(chunk)
+            state['training_seconds'] += time.time() - chunk_start
+            if state.get('rows_scored'):
+                running_mse = state['squared_error'] / state['rows_scored']
+                print(f"Chunk {state['chunks_done']}: {state['rows_seen']} rows seen, progressive MSE {running_mse:.2f}")
+            else:
+                print(f"Chunk {state['chunks_done']}: {state['rows_seen']} rows seen")
+
+            if state['chunks_done'] % args.checkpoint_every == 0:
+                _save_checkpoint(state, args.checkpoint)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if state['rows_seen'] == 0:
+        print("Error: no training rows found.")
+        exit()
+    if not state['holdout_texts']:
+        print("Error: no rows were held out for the model card; use a larger dataset or --holdout-rows.")
+        exit()
+    # A rerun after a budget violation resumes here instead of training again
+    _save_checkpoint(state, args.checkpoint)
+
+    records = featurize_parallel(state['holdout_texts'], workers=args.workers, chunk_size=args.chunk_size)
+    X_test = feature_matrix(records, vectorizer)
+    y_test = np.array(state['holdout_scores'], dtype=float)
+    extra = {'params': regressor.get_params(), 'rows_seen': state['rows_seen']}
+    if state.get('rows_scored'):
+        extra['progressive_mse'] = round(state['squared_error'] / state['rows_scored'], 4)
+    publish_model(state['pipeline'], vectorizer, X_test, y_test, state['training_seconds'], extra=extra, compact=False)
+    os.remove(args.checkpoint)
+
+    print(f"\n✅ Streaming model trained on {state['rows_seen']} rows and saved!")
+    print(f"Files created: 'pitch_quality_model.pkl', 'tfidf_vectorizer.pkl' and '{config.model.MODEL_CARD_PATH}'")
+
+def publish_model(model, vectorizer, X_test, y_test, training_seconds, extra=None, compact=True):
+    """Stage the artifacts, build and check their model card, then swap them in.
 
-def get_readability(text):
+    Nothing replaces the served artifacts until the new card passes the
+    current card's budgets; on a violation this exits with status 1. With
+    `compact`, a compact forest is exported and served; otherwise the pickle
+    is, and a stale compact forest is removed so it is not served instead.
+    """
+    served_path = 'pitch_quality_forest.npz' if compact else 'pitch_quality_model.pkl'
+    artifacts = ['pitch_quality_model.pkl', 'tfidf_vectorizer.pkl', config.model.MODEL_CARD_PATH]
+    if compact:
+        artifacts.append('pitch_quality_forest.npz')
+    staging_dir = tempfile.mkdtemp(prefix='.train_staging_', dir='.')
+    staged = {path: os.path.join(staging_dir, os.path.basename(path)) for path in artifacts}
     try:
-        return len(text.split()) / (text.count('.') + 1)  # crude avg sentence length
-    except Exception:
-        return 20  # Neutral value if error
-
-def get_length(text):
-    return len(text.split())
-
-df['sentiment'] = df['pitch_text'].apply(get_sentiment)
-df['readability'] = df['pitch_text'].apply(get_readability)
-df['length'] = df['pitch_text'].apply(get_length)
-
-# 3. Define features (X) and target (y)
-X_text = df['processed_text']
-y = df['score']
-
-# 4. Create and fit the TF-IDF Vectorizer
-vectorizer = TfidfVectorizer(max_features=3000, min_df=2, ngram_range=(1, 2))
-X_vectorized = vectorizer.fit_transform(X_text)
-print("Text vectorization complete.")
-
-# 4b. Combine with additional features
-section_cols = [f'section_{s}' for s in section_keywords]
-extra_features = df[['sentiment', 'readability', 'length'] + section_cols].values
-X_full = hstack([X_vectorized, extra_features])
-
-# 5. Split data for training and testing
-X_train, X_test, y_train, y_test = train_test_split(X_full, y, test_size=0.2, random_state=42)
-
-# 6. Initialize and train the Machine Learning model
-print("Training the RandomForestRegressor model...")
-model = RandomForestRegressor(n_estimators=150, max_depth=10, min_samples_leaf=2, random_state=42)
-model.fit(X_train, y_train)
-print("Model training complete.")
-
-# 7. Evaluate the model (optional but recommended)
-predictions = model.predict(X_test)
-mse = mean_squared_error(y_test, predictions)
-print(f"Model Performance (Mean Squared Error): {mse:.2f}")
-
-# 8. Save the trained model and the vectorizer
-joblib.dump(model, 'pitch_quality_model.pkl')
-joblib.dump(vectorizer, 'tfidf_vectorizer.pkl')
-
-print("\n✅ Model and vectorizer have been saved successfully!")
-print("Files created: 'pitch_quality_model.pkl' and 'tfidf_vectorizer.pkl'") 
\ No newline at end of file
+        joblib.dump(model, staged['pitch_quality_model.pkl'])
+        joblib.dump(vectorizer, staged['tfidf_vectorizer.pkl'])
+
+        # Export the compact array-backed forest used for low-latency serving
+        if compact:
+            forest = CompactForest.from_sklearn(model)
+            max_error = verify_against(model, forest, X_test)
+            forest.save(staged['pitch_quality_forest.npz'])
+            print(f"Compact forest exported (max deviation from sklearn: {max_error:.2e})")
+
+        # Build the model card and check it against the current model's budgets
+        card = build_model_card(staged[served_path], staged['tfidf_vectorizer.pkl'], X_test, y_test,
+                                training_seconds, extra=extra)
+        card['model_path'] = served_path
+        save_model_card(card, staged[config.model.MODEL_CARD_PATH])
+        print(f"Model card: p50 {card['latency_ms']['p50']}ms, p99 {card['latency_ms']['p99']}ms, "
+              f"load {card['load_ms']}ms, {card['size_bytes'] / 1e6:.1f}MB")
+
+        previous_card = load_model_card(config.model.MODEL_CARD_PATH)
+        violations = check_model_card(card, previous_card) if previous_card else []
+        for violation in violations:
+            print(f"❌ {violation}")
+        if violations:
+            print("Budgets exceeded; the current model and its card were left in place")
+            sys.exit(1)
+
+        if previous_card:
+            save_model_card(previous_card, config.model.MODEL_CARD_PATH + '.previous')
+        if not compact and os.path.exists('pitch_quality_forest.npz'):
+            # Served in preference to the pickle; drop it first so the old pair stays consistent
+            os.remove('pitch_quality_forest.npz')
+            print("Removed stale 'pitch_quality_forest.npz'")
+        for path in artifacts:
+            os.replace(staged[path], path)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def dataset_hash(path):
+    """SHA-256 of the dataset file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_feature_matrix(df, args):
+    """Featurize and vectorize the dataset, reusing the on-disk cache when possible.
+
+    Cache entries are keyed by the dataset hash, the rows kept after cleaning
+    and dedup, FEATURE_VERSION and the vectorizer parameters, so changing any
+    of them produces a fresh entry.
+    """
+    cache_path = None
+    if args.cache_dir:
+        rows_hash = hashlib.sha256(df.index.to_numpy().tobytes()).hexdigest()
+        key_source = json.dumps([dataset_hash(args.data), rows_hash, FEATURE_VERSION, VECTORIZER_PARAMS], default=str)
+        key = hashlib.sha256(key_source.encode()).hexdigest()[:16]
+        cache_path = os.path.join(args.cache_dir, f"features_{key}.joblib")
+        if os.path.exists(cache_path):
+            print(f"Loaded cached feature matrix from '{cache_path}'")
+            return joblib.load(cache_path)
+
+    # 3. Featurize the pitch text with the same featurizer the app uses
+    print(f"Featurizing pitches (feature version {FEATURE_VERSION}) with {args.workers} worker(s)...")
+    records = featurize_parallel(df['pitch_text'], workers=args.workers, chunk_size=args.chunk_size)
+
+    # Create and fit the TF-IDF Vectorizer, then combine with dense features
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    vectorizer.fit([record['tokens'] for record in records])
+    bundle = {
+        'X': feature_matrix(records, vectorizer),
+        'y': df['score'].to_numpy(dtype=float),
+        'vectorizer': vectorizer
+    }
+    print("Text vectorization complete.")
+
+    if cache_path:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        joblib.dump(bundle, cache_path)
+        print(f"Cached feature matrix to '{cache_path}'")
+    return bundle
+
+def tune_model(X_train, y_train, args):
+    """Cross-validated random search over forest settings, run in parallel."""
+    print(f"Tuning: {args.tune_iterations} candidates x {args.cv}-fold CV...")
+    search = RandomizedSearchCV(
+        RandomForestRegressor(random_state=42),
+        RF_PARAM_DISTRIBUTIONS,
+        n_iter=args.tune_iterations,
+        cv=args.cv,
+        scoring='neg_mean_squared_error',
+        n_jobs=args.workers,
+        random_state=42,
+        verbose=1
+    )
+    search.fit(X_train, y_train)
+
+    results = pd.DataFrame(search.cv_results_)
+    columns = ['rank_test_score', 'mean_test_score', 'std_test_score', 'mean_fit_time', 'params']
+    results = results[columns].sort_values('rank_test_score')
+    results['mean_test_mse'] = -results.pop('mean_test_score')
+    results.to_csv(args.tune_results, index=False)
+    print(f"Best params: {search.best_params_} (CV MSE {-search.best_score_:.2f})")
+    print(f"Tuning results written to '{args.tune_results}'")
+    return search.best_estimator_
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the pitch quality model.")
+    parser.add_argument('--data', default='pitches_data.csv',
+                        help="CSV with 'pitch_text' and 'score' columns")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Featurization worker processes (1 disables the pool)")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Pitches per featurization chunk")
+    parser.add_argument('--stream', action='store_true',
+                        help="Train out of core with a hashing featurizer and SGDRegressor")
+    parser.add_argument('--stream-chunk-rows', type=int, default=20000,
+                        help="CSV rows read per streaming chunk")
+    parser.add_argument('--holdout-rows', type=int, default=2000,
+                        help="Streaming rows held out from training to measure the model card")
+    parser.add_argument('--checkpoint', default='train_checkpoint.pkl',
+                        help="Streaming checkpoint file, resumed from if present")
+    parser.add_argument('--checkpoint-every', type=int, default=10,
+                        help="Streaming chunks between checkpoints")
+    parser.add_argument('--cache-dir', default='.feature_cache',
+                        help="Directory for cached feature matrices ('' disables caching)")
+    parser.add_argument('--tune', action='store_true',
+                        help="Run a cross-validated hyperparameter search instead of the fixed forest")
+    parser.add_argument('--tune-iterations', type=int, default=20,
+                        help="Parameter settings sampled by --tune")
+    parser.add_argument('--cv', type=int, default=5,
+                        help="Cross-validation folds for --tune")
+    parser.add_argument('--tune-results', default='tuning_results.csv',
+                        help="Where --tune writes its results table")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop near-duplicate pitches, keeping one per MinHash/LSH cluster")
+    parser.add_argument('--group-split', action='store_true',
+                        help="Split train/test by near-duplicate cluster so copies never straddle the split")
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help="Estimated Jaccard similarity above which pitches are near-duplicates")
+    parser.add_argument('--lsh-bands', type=int, default=16,
+                        help="LSH bands (must divide the 128 MinHash permutations)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.stream:
+        return train_streaming(args)
+
+    # 1. Load the dataset
+    try:
+        df = pd.read_csv(args.data)
+        print("Dataset loaded successfully.")
+    except FileNotFoundError:
+        print(f"Error: '{args.data}' not found. Please create it first.")
+        exit()
+
+    # Ensure columns are correct
+    if 'pitch_text' not in df.columns or 'score' not in df.columns:
+        print("Error: CSV must have 'pitch_text' and 'score' columns.")
+        exit()
+
+    df.dropna(inplace=True) # Remove rows with missing data
+
+    # 2. Optionally remove re-uploads of the same deck
+    clusters = None
+    if args.dedup or args.group_split:
+        keep, clusters = find_near_duplicates(df, args)
+        if args.dedup:
+            df = df[keep]
+            clusters = clusters[keep]
+
+    bundle = build_feature_matrix(df, args)
+    vectorizer = bundle['vectorizer']
+
+    # 4. Split data for training and testing
+    if args.group_split:
+        splitter = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+        train_idx, test_idx = next(splitter.split(bundle['X'], bundle['y'], groups=clusters))
+        X_train, X_test = bundle['X'][train_idx], bundle['X'][test_idx]
+        y_train, y_test = bundle['y'][train_idx], bundle['y'][test_idx]
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(bundle['X'], bundle['y'], test_size=0.2, random_state=42)
+
+    # 5. Initialize and train the Machine Learning model
+    train_start = time.time()
+    if args.tune:
+        model = tune_model(X_train, y_train, args)
+    else:
+        print("Training the RandomForestRegressor model...")
+        model = RandomForestRegressor(n_estimators=150, max_depth=10, min_samples_leaf=2, random_state=42)
+        model.fit(X_train, y_train)
+    training_seconds = time.time() - train_start
+    print(f"Model training complete in {training_seconds:.1f}s.")
+
+    # 6. Evaluate the model (optional but recommended)
+    predictions = model.predict(X_test)
+    mse = mean_squared_error(y_test, predictions)
+    print(f"Model Performance (Mean Squared Error): {mse:.2f}")
+
+    # 7. Stage the model, vectorizer and compact forest, build the model card and
+    # swap them in only if the card is within the current model's budgets
+    publish_model(model, vectorizer, X_test, y_test, training_seconds, extra={'params': model.get_params()})
+
+    print("\n✅ Model and vectorizer have been saved successfully!")
+    print("Files created: 'pitch_quality_model.pkl', 'tfidf_vectorizer.pkl', 'pitch_quality_forest.npz' "
+          f"and '{config.model.MODEL_CARD_PATH}'")
+
+if __name__ == "__main__":
+    main()
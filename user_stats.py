@@ -0,0 +1,169 @@
+import time
+import threading
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, Any
+from config import config
+
+if TYPE_CHECKING:
+    # Only the Supabase store needs the client; the SQLite backend imports this module without it
+    from supabase import Client
+
+@dataclass
+class UserStats:
+    """Aggregates over a user's analyses, updated one save or delete at a time."""
+    total_analyses: int = 0
+    score_sum: float = 0.0
+    best_score: float = 0.0
+    last_date: Optional[str] = None
+    rolling_avg: Optional[float] = None  # exponential moving average, recent analyses weigh more
+
+    @property
+    def avg_score(self) -> float:
+        return round(self.score_sum / self.total_analyses, 1) if self.total_analyses else 0
+
+    def add(self, score: float, date: Optional[str], alpha: float):
+        self.total_analyses += 1
+        self.score_sum += score
+        self.best_score = max(self.best_score, score)
+        if date and (self.last_date is None or str(date) > str(self.last_date)):
+            self.last_date = str(date)
+        self.rolling_avg = score if self.rolling_avg is None else round(alpha * score + (1 - alpha) * self.rolling_avg, 2)
+
+    def remove(self, score: float, date: Optional[str] = None) -> bool:
+        """Take one analysis out; returns False if the stats must be rebuilt.
+
+        A rebuild is needed when the best score or the latest analysis was
+        removed. The rolling average is left as is: an EMA cannot un-see a value.
+        """
+        self.total_analyses = max(0, self.total_analyses - 1)
+        if self.total_analyses == 0:
+            self.score_sum, self.best_score, self.last_date, self.rolling_avg = 0.0, 0.0, None, None
+            return True
+        self.score_sum -= score
+        return score < self.best_score and (date is None or str(date) != self.last_date)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'avg_score': self.avg_score}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserStats":
+        return cls(
+            total_analyses=int(data.get('total_analyses') or 0),
+            score_sum=float(data.get('score_sum') or 0),
+            best_score=float(data.get('best_score') or 0),
+            last_date=data.get('last_date'),
+            rolling_avg=float(data['rolling_avg']) if data.get('rolling_avg') is not None else None
+        )
+
+class MemoryUserStatsStore:
+    """Stats kept in process memory: the local stand-in, and the read cache in front of the table.
+
+    With a `ttl`, entries older than `ttl` seconds are treated as missing.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._stats: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> Optional[UserStats]:
+        with self._lock:
+            entry = self._stats.get(str(user_id))
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+            return None
+        return UserStats.from_dict(entry[1])
+
+    def put(self, user_id, stats: UserStats):
+        with self._lock:
+            self._stats[str(user_id)] = (time.monotonic(), stats.to_dict())
+
+    def update(self, user_id, apply: Callable[[UserStats], bool]) -> Optional[bool]:
+        """Apply a change to the stored stats under the lock.
+
+        Returns None if there are no stats (or they expired), otherwise what
+        `apply` returned; the change is kept only if that was True.
+        """
+        with self._lock:
+            entry = self._stats.get(str(user_id))
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+                return None
+            stats = UserStats.from_dict(entry[1])
+            if not apply(stats):
+                return False
+            self._stats[str(user_id)] = (time.monotonic(), stats.to_dict())
+            return True
+
+    def delete(self, user_id):
+        with self._lock:
+            self._stats.pop(str(user_id), None)
+
+class SupabaseUserStatsStore:
+    """One row per user in the 'user_stats' table.
+
+    Reads for display go through a short-lived per-process cache. Updates
+    always start from a fresh read and are compare-and-swap writes on the
+    row's `version`, so a concurrent update from another process or replica
+    is retried, not lost. The table is created by supabase_schema.sql.
+    """
+
+    TABLE = "user_stats"
+    MAX_UPDATE_ATTEMPTS = 5
+
+    def __init__(self, sb: "Client", cache_ttl: float = 60):
+        self.sb = sb
+        self.cache = MemoryUserStatsStore(ttl=cache_ttl)
+
+    def _fetch(self, user_id) -> Tuple[Optional[UserStats], int]:
+        """The stored stats and the row version; (None, 0) if there is no row."""
+        res = self.sb.table(self.TABLE).select("*").eq("user_id", user_id).limit(1).execute()
+        if not res.data:
+            return None, 0
+        return UserStats.from_dict(res.data[0]), int(res.data[0].get('version') or 0)
+
+    @staticmethod
+    def _row(user_id, stats: UserStats, version: int) -> Dict[str, Any]:
+        return {'user_id': user_id, 'version': version,
+                **{k: v for k, v in stats.to_dict().items() if k != 'avg_score'}}
+
+    def get(self, user_id) -> Optional[UserStats]:
+        stats = self.cache.get(user_id)
+        if stats is None:
+            stats, _ = self._fetch(user_id)
+            if stats is not None:
+                self.cache.put(user_id, stats)
+        return stats
+
+    def put(self, user_id, stats: UserStats):
+        # A new version makes any update that read the replaced row retry
+        _, version = self._fetch(user_id)
+        self.sb.table(self.TABLE).upsert(self._row(user_id, stats, version + 1)).execute()
+        self.cache.put(user_id, stats)
+
+    def update(self, user_id, apply: Callable[[UserStats], bool]) -> Optional[bool]:
+        """Apply a change to the stored row; see MemoryUserStatsStore.update.
+
+        The write only matches if the row's version is still the one read; if
+        another writer got there first, the change is re-applied to a fresh read.
+        """
+        for _ in range(self.MAX_UPDATE_ATTEMPTS):
+            stats, version = self._fetch(user_id)
+            if stats is None:
+                return None
+            if not apply(stats):
+                return False
+            res = (self.sb.table(self.TABLE).update(self._row(user_id, stats, version + 1))
+                   .eq("user_id", user_id)
+                   .eq("version", version)
+                   .execute())
+            if res.data:
+                self.cache.put(user_id, stats)
+                return True
+        raise RuntimeError(f"Stats for user {user_id} kept changing during the update")
+
+    def delete(self, user_id):
+        self.sb.table(self.TABLE).delete().eq("user_id", user_id).execute()
+        self.cache.delete(user_id)
+
+# Process-wide stand-in used when there is no stats table. Entries expire, so
+# stats are rebuilt from the analyses table and pick up other replicas' saves.
+local_stats_store = MemoryUserStatsStore(ttl=config.cache.USER_STATS_TTL)